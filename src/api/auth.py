@@ -1,25 +1,56 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Dict
-from ..database import engine
+from ..database import get_async_session
 from ..models.user import User, UserCreate, UserPublic
-from ..services.auth_service import authenticate_user, create_user, get_user_by_email
+from ..models.refresh_token import RefreshRequest
+from ..services.auth_service import authenticate_user_async, create_user_async, get_user_by_email_async
+from ..services.auth_service import (
+    create_refresh_token_async, revoke_refresh_token_async, rotate_refresh_token_async
+)
 from ..api.middleware.auth_middleware import JWTBearer
 from ..services.auth_service import create_access_token
+from ..config.settings import settings
+from ..services.password_hasher import PasswordHasherBusy
 from datetime import timedelta
 
 router = APIRouter()
 
 
-def get_session():
-    with Session(engine) as session:
-        yield session
+def auth_busy() -> HTTPException:
+    """Fast 503 for when the bcrypt pool is saturated"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+def token_response(user_id: str, refresh_token: str) -> Dict:
+    """Short-lived access token plus the refresh token that renews it"""
+    access_token = create_access_token(
+        data={"sub": user_id}, expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": settings.access_token_expire_minutes * 60,
+    }
+
+
+def invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
 
 @router.post("/register")
-def register(user: UserCreate, session: Session = Depends(get_session)):
+async def register(user: UserCreate, session: AsyncSession = Depends(get_async_session)):
     # Check if user already exists
-    existing_user = get_user_by_email(session, email=user.email)
+    existing_user = await get_user_by_email_async(session, email=user.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -27,20 +58,23 @@ def register(user: UserCreate, session: Session = Depends(get_session)):
         )
     
     # Create new user
-    db_user = create_user(session, user)
-    
-    # Create access token for the new user
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": str(db_user.id)}, expires_delta=access_token_expires
-    )
+    try:
+        db_user = await create_user_async(session, user)
+    except PasswordHasherBusy:
+        raise auth_busy()
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Create access and refresh tokens for the new user
+    refresh_token = await create_refresh_token_async(session, str(db_user.id))
+    await session.commit()
+    return token_response(str(db_user.id), refresh_token)
 
 
 @router.post("/login")
-def login(user: UserCreate, session: Session = Depends(get_session)):
-    db_user = authenticate_user(session, user.email, user.password)
+async def login(user: UserCreate, session: AsyncSession = Depends(get_async_session)):
+    try:
+        db_user = await authenticate_user_async(session, user.email, user.password)
+    except PasswordHasherBusy:
+        raise auth_busy()
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -48,10 +82,26 @@ def login(user: UserCreate, session: Session = Depends(get_session)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Create access token
-    access_token_expires = timedelta(minutes=30)  # Use the value from settings
-    access_token = create_access_token(
-        data={"sub": str(db_user.id)}, expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    # Create access and refresh tokens
+    refresh_token = await create_refresh_token_async(session, str(db_user.id))
+    await session.commit()
+    return token_response(str(db_user.id), refresh_token)
+
+
+@router.post("/refresh")
+async def refresh(request: RefreshRequest, session: AsyncSession = Depends(get_async_session)):
+    """Trade a refresh token for a new access token and a rotated refresh token"""
+    rotated = await rotate_refresh_token_async(session, request.refresh_token)
+    # Commit even on failure: reuse detection revokes the token family
+    await session.commit()
+    if rotated is None:
+        raise invalid_refresh_token()
+    user_id, refresh_token = rotated
+    return token_response(user_id, refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: RefreshRequest, session: AsyncSession = Depends(get_async_session)):
+    """Revoke the refresh token (and every token rotated from it)"""
+    await revoke_refresh_token_async(session, request.refresh_token)
+    await session.commit()
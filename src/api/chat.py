@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlmodel import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Any, AsyncIterator, List, Optional
 from uuid import UUID
-from ..database import get_session
+from ..database import async_engine, get_async_session
 from ..models.chat import ChatRequest, ChatResponse
+from ..models.conversation import Conversation
 from ..services.conversation_service import ConversationService
+from ..services.pagination import InvalidCursor, next_cursor_for
 from ..services.todo_agent import TodoAgent
+from ..services.llm.scheduler import LLMBusy
 from ..api.middleware.auth_middleware import JWTBearer
 from ..config.settings import settings
+import json
+import math
 import os
 
 router = APIRouter()
@@ -28,11 +36,11 @@ def get_current_user_id(request: Request) -> str:
 
 
 @router.post("/api/chat", response_model=ChatResponse)
-def chat_endpoint(
+async def chat_endpoint(
     request: Request,
     chat_request: ChatRequest,
     token: str = Depends(JWTBearer()),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Send message & get AI response"""
     user_id = get_current_user_id(request)
@@ -42,58 +50,53 @@ def chat_endpoint(
     print(f"Conversation ID: {chat_request.conversation_id}")
     
     try:
-        # Get or create conversation
-        conversation = ConversationService.get_or_create_conversation(
-            session, user_id, chat_request.conversation_id
-        )
-        
-        # Get conversation history
-        history = ConversationService.get_conversation_history(session, conversation.id)
-        history_dict = [
-            {"role": msg.role, "content": msg.content}
-            for msg in history
-        ]
-        
-        # Store user message
-        ConversationService.add_message(
-            session, conversation.id, user_id, "user", chat_request.message
-        )
+        # Conversation and recent history (plus the summary of older turns); the read
+        # transaction ends here, so no pooled connection is held while the LLM answers
+        turn = await ConversationService.begin_turn_async(session, user_id, chat_request.conversation_id)
+        conversation_id = turn.conversation_id
         
         # Process message with agent
         try:
-            agent_response = todo_agent.process_message(
-                session, user_id, chat_request.message, history_dict
+            agent_response = await todo_agent.process_message(
+                session, user_id, chat_request.message, turn.history
+            )
+        except LLMBusy as busy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The assistant is busy, please retry shortly",
+                headers={"Retry-After": str(max(1, math.ceil(busy.retry_after)))},
             )
         except Exception as agent_error:
             # If agent processing fails, rollback and create error response
             print(f"Agent processing error: {str(agent_error)}")
-            session.rollback()
+            await session.rollback()
             
             # Create a fallback response
             from ..models.chat import ChatResponse
             agent_response = ChatResponse(
-                conversation_id=conversation.id,
+                conversation_id=conversation_id,
                 response=f"Sorry, I encountered an error processing your request. Please try again.",
                 tool_calls=[]
             )
         
         # Update conversation_id in response
-        agent_response.conversation_id = conversation.id
+        agent_response.conversation_id = conversation_id
         
-        # Store assistant response
+        # Store both messages with the tool changes, in one transaction
         try:
-            ConversationService.add_message(
-                session, conversation.id, user_id, "assistant", agent_response.response
+            await ConversationService.save_turn_async(
+                session, turn, user_id, chat_request.message, agent_response.response
             )
-            # Commit all changes in one transaction
-            session.commit()
+            await session.commit()
         except Exception as msg_error:
             print(f"Error storing assistant message: {str(msg_error)}")
-            session.rollback()
+            await session.rollback()
             # Still return the response even if we couldn't store it
         
         return agent_response
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in chat endpoint: {str(e)}")
         import traceback
@@ -101,7 +104,7 @@ def chat_endpoint(
         
         # Rollback any pending transaction
         try:
-            session.rollback()
+            await session.rollback()
         except:
             pass
         
@@ -111,20 +114,93 @@ def chat_endpoint(
         )
 
 
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@router.post("/api/chat/stream")
+async def chat_stream_endpoint(
+    request: Request,
+    chat_request: ChatRequest,
+    token: str = Depends(JWTBearer()),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Send message & stream the AI response as server-sent events: conversation,
+    token, tool_call, tool_result, error, then done once the turn is stored
+    """
+    user_id = get_current_user_id(request)
+    
+    try:
+        turn = await ConversationService.begin_turn_async(session, user_id, chat_request.conversation_id)
+        conversation_id = turn.conversation_id
+    except Exception as e:
+        print(f"Error in chat stream endpoint: {str(e)}")
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Chat processing failed: {str(e)}"
+        )
+    
+    async def events() -> AsyncIterator[str]:
+        yield sse_event("conversation", {"conversation_id": conversation_id})
+        final = {"response": "", "tool_calls": []}
+        # The stream outlives the request's dependencies, so it owns its session
+        async with AsyncSession(async_engine, expire_on_commit=False) as stream_session:
+            async for event in todo_agent.stream_message(stream_session, user_id, chat_request.message, turn.history):
+                if event["event"] == "done":
+                    final = event["data"]
+                    continue
+                yield sse_event(event["event"], event["data"])
+            
+            # Store the turn once the stream is complete
+            try:
+                await ConversationService.save_turn_async(
+                    stream_session, turn, user_id, chat_request.message, final["response"]
+                )
+                await stream_session.commit()
+            except Exception as msg_error:
+                print(f"Error storing assistant message: {str(msg_error)}")
+                await stream_session.rollback()
+        
+        yield sse_event("done", {"conversation_id": conversation_id, **final})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop proxies (nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/api/conversations")
-def list_conversations(
+async def list_conversations(
     request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     token: str = Depends(JWTBearer()),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """List user's conversations"""
+    """
+    List user's conversations, most recently updated first.
+    Pass the `X-Next-Cursor` response header back as `before` for older conversations
+    (or, after paging with `after`, as `after` for newer ones); it is omitted on the last page.
+    """
     user_id = get_current_user_id(request)
     
-    from sqlmodel import select
-    conversations = session.exec(
-        select(Conversation).where(Conversation.user_id == user_id)
-        .order_by(Conversation.updated_at.desc())
-    ).all()
+    try:
+        conversations = await ConversationService.list_conversations_page_async(
+            session, user_id, limit, before, after
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # The cursor continues from the last row in read order (oldest, or newest with `after`)
+    next_cursor = next_cursor_for(conversations[::-1] if after else conversations, limit, "updated_at")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return [
         {
@@ -137,23 +213,30 @@ def list_conversations(
 
 
 @router.get("/api/conversations/{conversation_id}/messages")
-def get_conversation_messages(
+async def get_conversation_messages(
     conversation_id: UUID,
     request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     token: str = Depends(JWTBearer()),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Get messages in a conversation"""
+    """
+    Get messages in a conversation in chronological order, the latest page first.
+    Pass the `X-Next-Cursor` response header back as `before` to load older messages
+    (or, after paging with `after`, as `after` for newer ones); it is omitted on the last page.
+    """
     user_id = get_current_user_id(request)
     
     # Verify conversation belongs to user
-    from sqlmodel import select
-    conversation = session.exec(
+    conversation = (await session.exec(
         select(Conversation).where(
             Conversation.id == conversation_id,
             Conversation.user_id == user_id
         )
-    ).first()
+    )).first()
     
     if not conversation:
         raise HTTPException(
@@ -161,7 +244,13 @@ def get_conversation_messages(
             detail="Conversation not found"
         )
     
-    messages = ConversationService.get_conversation_history(session, conversation_id)
+    try:
+        messages = await ConversationService.get_messages_page_async(session, conversation_id, limit, before, after)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    next_cursor = next_cursor_for(messages if after else messages[::-1], limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return [
         {
             "id": msg.id,
@@ -1,3 +1,7 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
@@ -7,6 +11,72 @@ from sqlmodel import Session
 from ...database import engine
 
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU of tokens that passed a full jwt.decode, mapped to (sub, exp).
+    Keys are the exact token strings, so an altered token can never hit. An entry
+    is served only while time.time() < exp, and the whole cache is dropped when
+    the signing secret or algorithm changes.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._signing_key: Tuple[str, str] = (settings.secret_key, settings.algorithm)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _check_signing_key(self):
+        signing_key = (settings.secret_key, settings.algorithm)
+        if signing_key != self._signing_key:
+            self._entries.clear()
+            self._signing_key = signing_key
+
+    def get(self, token: str) -> Optional[str]:
+        with self._lock:
+            self._check_signing_key()
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            sub, exp = entry
+            if time.time() >= exp:
+                del self._entries[token]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return sub
+
+    def put(self, token: str, sub: str, exp: float):
+        with self._lock:
+            self._check_signing_key()
+            self._entries[token] = (sub, exp)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+token_cache = VerifiedTokenCache(settings.jwt_cache_max_entries)
+
+
 class JWTBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
         super(JWTBearer, self).__init__(auto_error=auto_error)
@@ -38,10 +108,17 @@ class JWTBearer(HTTPBearer):
             )
 
     def verify_jwt(self, jwt_token: str) -> str:
+        user_id = token_cache.get(jwt_token)
+        if user_id:
+            return user_id
         try:
             payload = jwt.decode(jwt_token, settings.secret_key, algorithms=[settings.algorithm])
             user_id: str = payload.get("sub")
             if user_id:
+                # Only tokens with an expiry are cached, so every entry ages out
+                exp = payload.get("exp")
+                if isinstance(exp, (int, float)):
+                    token_cache.put(jwt_token, user_id, exp)
                 return user_id
         except JWTError:
             pass
@@ -0,0 +1,85 @@
+import json
+import math
+from typing import Optional, Tuple
+from starlette.types import ASGIApp, Receive, Scope, Send
+from ...config.settings import settings
+from ...services.rate_limiter import SlidingWindowLimiter
+from ...services.shared_store import AsyncLocalSharedStore, get_async_shared_store
+from .auth_middleware import JWTBearer
+
+
+def build_rate_limiter(backend: str) -> Optional[SlidingWindowLimiter]:
+    """Create the limiter for settings.rate_limit_backend ("memory", "shared" or "none")"""
+    if backend == "memory":
+        return SlidingWindowLimiter(AsyncLocalSharedStore(), settings.rate_limit_window_seconds)
+    if backend == "shared":
+        return SlidingWindowLimiter(get_async_shared_store(), settings.rate_limit_window_seconds)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+
+rate_limiter = build_rate_limiter(settings.rate_limit_backend)
+
+
+class RateLimitMiddleware:
+    """
+    Charges every HTTP request its route cost (settings.rate_limit_costs) against the
+    caller's budget and answers 429 with Retry-After once the budget is spent.
+    Authenticated callers are keyed by user id, everyone else by client IP.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: Optional[SlidingWindowLimiter] = None):
+        self.app = app
+        self.limiter = limiter
+        self._bearer = JWTBearer(auto_error=False)
+
+    def _cost(self, method: str, path: str) -> int:
+        return settings.rate_limit_costs.get(f"{method} {path.rstrip('/') or '/'}", settings.rate_limit_default_cost)
+
+    def _identify(self, scope: Scope) -> Tuple[str, int]:
+        """Return the limiter key and budget, setting state.user_id for a valid bearer token"""
+        state = scope.setdefault("state", {})
+        user_id = state.get("user_id")
+        if user_id is None:
+            for name, value in scope.get("headers", []):
+                if name == b"authorization":
+                    scheme, _, token = value.decode("latin-1").partition(" ")
+                    if scheme == "Bearer" and token:
+                        # Cached by JWTBearer, so the route's own check is a cache hit
+                        user_id = self._bearer.verify_jwt(token)
+                        if user_id:
+                            state["user_id"] = user_id
+                    break
+        if user_id:
+            return f"user:{user_id}", settings.rate_limit_user_budget
+        # Behind a proxy, run uvicorn with --proxy-headers so this is the real client
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}", settings.rate_limit_ip_budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self.limiter is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        cost = self._cost(scope["method"], scope["path"])
+        if cost <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        key, budget = self._identify(scope)
+        allowed, retry_after = await self.limiter.hit(key, cost, budget)
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "Rate limit exceeded"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
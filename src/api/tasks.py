@@ -1,21 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlmodel import Session
-from typing import List
-from ..database import engine
-from ..models.task import Task, TaskCreate, TaskRead, TaskUpdate, TaskToggleComplete
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Any, Dict, List, Optional
+import csv
+import hashlib
+import io
+import json
+from ..database import async_engine, get_async_session
+from ..models.task import (
+    Task, TaskCreate, TaskRead, TaskUpdate, TaskToggleComplete,
+    TaskBulkCreate, TaskBulkIds, TaskBulkComplete, TaskBulkItemResult, TaskBulkResult,
+    TaskImportResult, TaskStatsRead
+)
 from ..services.task_service import (
-    create_task, get_tasks, get_task, update_task, delete_task, toggle_task_completion
+    create_task_async, get_tasks_async, get_task_async, update_task_async,
+    delete_task_async, toggle_task_completion_async,
+    get_tasks_version_async, get_task_version_async,
+    create_tasks_bulk_async, set_tasks_completed_bulk_async, delete_tasks_bulk_async,
+    iter_tasks_async
 )
+from ..config.settings import settings
+from ..services.search_service import search_tasks_async
+from ..services.stats_service import get_task_stats_async
+from ..services.task_import import detect_format, import_tasks_from_upload
+from ..services.pagination import InvalidCursor, next_cursor_for
 from ..api.middleware.auth_middleware import JWTBearer
 
 router = APIRouter()
 
 
-def get_session():
-    with Session(engine) as session:
-        yield session
-
-
 def get_current_user_id(request: Request) -> str:
     """Get user_id from JWT token stored in request state"""
     user_id = getattr(request.state, 'user_id', None)
@@ -27,85 +40,305 @@ def get_current_user_id(request: Request) -> str:
     return user_id
 
 
+def check_bulk_size(count: int):
+    """Reject bulk requests larger than settings.bulk_max_items"""
+    if count > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.bulk_max_items} items per bulk request"
+        )
+
+
+# Let clients store responses but always revalidate them with If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Build a strong ETag from the given version parts"""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against `etag`"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so ignore any W/ prefix
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
 @router.get("/tasks", response_model=List[TaskRead])
-def read_tasks(
+async def read_tasks(
     request: Request,
+    response: Response,
     completed: bool = None,
     offset: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     token: str = Depends(JWTBearer()),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
+    """
+    List tasks ordered by creation time.
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next page;
+    the header is omitted on the last page.
+    Responses carry an ETag; a matching If-None-Match gets a 304 without loading any rows.
+    """
     user_id = get_current_user_id(request)
-    tasks = get_tasks(session, user_id, completed, offset, limit)
+    version = await get_tasks_version_async(session, user_id)
+    etag = make_etag(user_id, version, completed, offset, limit, cursor)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        tasks = await get_tasks_async(session, user_id, completed, offset, limit, cursor=cursor, version=version)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    next_cursor = next_cursor_for(tasks, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
     return tasks
 
 
 @router.post("/tasks", response_model=TaskRead)
-def create_new_task(
+async def create_new_task(
     request: Request,
     task: TaskCreate,
     token: str = Depends(JWTBearer()),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     user_id = get_current_user_id(request)
-    db_task = create_task(session, task, user_id)
+    db_task = await create_task_async(session, task, user_id)
+    await session.commit()
     return db_task
 
 
+EXPORT_COLUMNS = ["id", "title", "description", "completed", "created_at", "updated_at"]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _export_value(value: Any):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (bool, int, str)) or value is None:
+        return value
+    return str(value)
+
+
+def _format_ndjson(rows: List[Dict[str, Any]]) -> str:
+    return "".join(
+        json.dumps({column: _export_value(row[column]) for column in EXPORT_COLUMNS}) + "\n"
+        for row in rows
+    )
+
+
+def _format_csv(rows: List[Dict[str, Any]], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows([_export_value(row[column]) for column in EXPORT_COLUMNS] for row in rows)
+    return buffer.getvalue()
+
+
+# Fixed paths below are registered before /tasks/{task_id} so they are not taken for a task id
+
+@router.get("/tasks/search", response_model=List[TaskRead])
+async def search_user_tasks(
+    request: Request,
+    q: str = Query(min_length=1, max_length=500),
+    completed: bool = None,
+    offset: int = 0,
+    limit: int = 50,
+    token: str = Depends(JWTBearer()),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Full-text search over task titles and descriptions, best match first"""
+    user_id = get_current_user_id(request)
+    return await search_tasks_async(session, user_id, q, completed, offset, limit)
+
+
+@router.get("/tasks/stats", response_model=TaskStatsRead)
+async def read_task_stats(
+    request: Request,
+    token: str = Depends(JWTBearer()),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Total/completed/pending counts from the per-user counters row"""
+    user_id = get_current_user_id(request)
+    stats = await get_task_stats_async(session, user_id)
+    # Persist the counters row if this call had to create it
+    await session.commit()
+    return TaskStatsRead(total=stats.total, completed=stats.completed, pending=stats.total - stats.completed)
+
+
+@router.get("/tasks/export")
+async def export_tasks(
+    request: Request,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    completed: bool = None,
+    token: str = Depends(JWTBearer()),
+):
+    """Stream all of the user's tasks as NDJSON or CSV with constant memory use"""
+    user_id = get_current_user_id(request)
+
+    async def generate():
+        # The stream outlives the request's dependencies, so it owns its session
+        async with AsyncSession(async_engine) as session:
+            if export_format == "csv":
+                yield _format_csv([], header=True)
+            async for rows in iter_tasks_async(session, user_id, completed):
+                yield _format_csv(rows) if export_format == "csv" else _format_ndjson(rows)
+
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{export_format}"'},
+    )
+
+
+@router.post("/tasks/import", response_model=TaskImportResult)
+async def import_tasks(
+    request: Request,
+    file: UploadFile = File(...),
+    import_format: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$"),
+    token: str = Depends(JWTBearer()),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Import tasks from an NDJSON or CSV upload (format defaults from the file name).
+    Rows are validated and inserted in chunks; invalid lines are reported, not fatal,
+    until the configured error or row limit is exceeded.
+    """
+    user_id = get_current_user_id(request)
+    import_format = import_format or detect_format(file.filename, file.content_type)
+    return await import_tasks_from_upload(session, file.file, import_format, user_id)
+
+
+@router.post("/tasks/bulk", response_model=TaskBulkResult)
+async def create_new_tasks_bulk(
+    request: Request,
+    bulk: TaskBulkCreate,
+    token: str = Depends(JWTBearer()),
+    session: AsyncSession = Depends(get_async_session)
+):
+    user_id = get_current_user_id(request)
+    check_bulk_size(len(bulk.tasks))
+    task_ids = await create_tasks_bulk_async(session, bulk.tasks, user_id)
+    await session.commit()
+    return TaskBulkResult(results=[
+        TaskBulkItemResult(id=task_id, status="created") for task_id in task_ids
+    ])
+
+
+@router.patch("/tasks/bulk/complete", response_model=TaskBulkResult)
+async def complete_tasks_bulk(
+    request: Request,
+    bulk: TaskBulkComplete,
+    token: str = Depends(JWTBearer()),
+    session: AsyncSession = Depends(get_async_session)
+):
+    user_id = get_current_user_id(request)
+    check_bulk_size(len(bulk.task_ids))
+    found = await set_tasks_completed_bulk_async(session, bulk.task_ids, bulk.completed, user_id)
+    await session.commit()
+    return TaskBulkResult(results=[
+        TaskBulkItemResult(id=task_id, status="updated" if ok else "not_found")
+        for task_id, ok in found.items()
+    ])
+
+
+@router.delete("/tasks/bulk", response_model=TaskBulkResult)
+async def delete_existing_tasks_bulk(
+    request: Request,
+    bulk: TaskBulkIds,
+    token: str = Depends(JWTBearer()),
+    session: AsyncSession = Depends(get_async_session)
+):
+    user_id = get_current_user_id(request)
+    check_bulk_size(len(bulk.task_ids))
+    found = await delete_tasks_bulk_async(session, bulk.task_ids, user_id)
+    await session.commit()
+    return TaskBulkResult(results=[
+        TaskBulkItemResult(id=task_id, status="deleted" if ok else "not_found")
+        for task_id, ok in found.items()
+    ])
+
+
 @router.get("/tasks/{task_id}", response_model=TaskRead)
-def read_task(
+async def read_task(
     request: Request,
+    response: Response,
     task_id: str,
     token: str = Depends(JWTBearer()),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     user_id = get_current_user_id(request)
-    db_task = get_task(session, task_id, user_id)
+    updated_at = await get_task_version_async(session, task_id, user_id)
+    if updated_at is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    etag = make_etag(task_id, updated_at.isoformat())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    db_task = await get_task_async(session, task_id, user_id)
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
     return db_task
 
 
 @router.put("/tasks/{task_id}", response_model=TaskRead)
-def update_existing_task(
+async def update_existing_task(
     request: Request,
     task_id: str,
     task: TaskUpdate,
     token: str = Depends(JWTBearer()),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     user_id = get_current_user_id(request)
-    db_task = update_task(session, task_id, task, user_id)
+    db_task = await update_task_async(session, task_id, task, user_id)
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
+    await session.commit()
     return db_task
 
 
 @router.delete("/tasks/{task_id}")
-def delete_existing_task(
+async def delete_existing_task(
     request: Request,
     task_id: str,
     token: str = Depends(JWTBearer()),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     user_id = get_current_user_id(request)
-    success = delete_task(session, task_id, user_id)
+    success = await delete_task_async(session, task_id, user_id)
     if not success:
         raise HTTPException(status_code=404, detail="Task not found")
+    await session.commit()
     return {"message": "Task deleted successfully"}
 
 
 @router.patch("/tasks/{task_id}/complete", response_model=TaskRead)
-def toggle_task_complete(
+async def toggle_task_complete(
     request: Request,
     task_id: str,
     task_toggle: TaskToggleComplete,
     token: str = Depends(JWTBearer()),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     user_id = get_current_user_id(request)
-    db_task = toggle_task_completion(session, task_id, task_toggle, user_id)
+    db_task = await toggle_task_completion_async(session, task_id, task_toggle, user_id)
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return db_task
\ No newline at end of file
+    await session.commit()
+    return db_task
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -14,13 +14,118 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 14
+    # Verified access tokens kept by JWTBearer to skip re-decoding
+    jwt_cache_max_entries: int = 10000
+    
+    # bcrypt process pool: workers default to the CPU count; calls beyond
+    # workers + max_queue are rejected with 503 instead of queueing
+    bcrypt_pool_workers: Optional[int] = None
+    bcrypt_pool_max_queue: int = 32
     
     # Better Auth settings
     better_auth_secret: str
     
+    # Task API settings
+    bulk_max_items: int = 5000
+    
+    # POST /tasks/import limits
+    task_import_chunk_size: int = 1000
+    task_import_max_rows: int = 100000
+    task_import_max_errors: int = 100
+    task_import_max_line_length: int = 20000
+    
+    # Task list cache: "memory" (per process), "shared" (shared_store_url / local stand-in) or "none"
+    task_cache_backend: str = "memory"
+    task_cache_ttl_seconds: float = 30
+    task_cache_max_entries: int = 10000
+    task_cache_max_bytes: int = 32 * 1024 * 1024
+    
+    # Redis URL for state shared across workers; an in-process stand-in is used when unset
+    shared_store_url: Optional[str] = None
+    
+    # Rate limiting: each request spends its route's cost from a sliding-window budget,
+    # keyed by user when authenticated and by client IP otherwise.
+    # Backend: "memory" (per process), "shared" (shared_store_url / local stand-in) or "none"
+    rate_limit_backend: str = "memory"
+    rate_limit_window_seconds: int = 60
+    rate_limit_user_budget: int = 600
+    rate_limit_ip_budget: int = 300
+    rate_limit_default_cost: int = 1
+    # "METHOD /path" (exact path) -> cost; unlisted routes cost rate_limit_default_cost
+    rate_limit_costs: Dict[str, int] = {
+        "POST /api/chat": 20,
+        "POST /api/chat/stream": 20,
+        "POST /auth/login": 10,
+        "POST /auth/register": 10,
+        "POST /auth/refresh": 2,
+        "POST /tasks/import": 50,
+        "GET /tasks/export": 20,
+        "GET /": 0,
+        "GET /health": 0,
+        "GET /metrics": 0,
+    }
+    
     # Groq settings
     groq_api_key: str
     groq_model: str = "llama-3.1-8b-instant"
+    # Long, multi-step or history-dependent messages, and fast-model tool calls that fail
+    # to parse, go to the capable model (unset = always groq_model)
+    groq_capable_model: Optional[str] = "llama-3.3-70b-versatile"
+    llm_router_max_fast_chars: int = 160
+    # Shared AsyncGroq connection pool; read timeout bounds the gap between streamed chunks
+    groq_timeout_seconds: float = 30
+    groq_connect_timeout_seconds: float = 5
+    # Retries after a timeout, connection error, 429 or 5xx (see llm_retry_backoff_*)
+    groq_max_retries: int = 2
+    groq_max_connections: int = 100
+    # Defaults to the public API; point at `python -m src.services.llm.fake_groq` for load tests
+    groq_base_url: Optional[str] = None
+    
+    # LLM dispatch: global concurrency cap and tokens-per-minute budget (0 = unlimited),
+    # per-user fair queueing, and how long a call may wait for a slot before a 503.
+    # The token window is per process ("memory") or in the shared store ("shared")
+    llm_max_concurrency: int = 16
+    llm_tokens_per_minute: int = 0
+    llm_completion_token_estimate: int = 256
+    llm_max_queue: int = 200
+    llm_max_queue_per_user: int = 3
+    llm_queue_timeout_seconds: float = 10
+    llm_scheduler_backend: str = "memory"
+    
+    # Each LLM attempt has its own timeout and all attempts share a total deadline;
+    # retries back off exponentially with full jitter. With hedging on, a second copy
+    # of a slow attempt is sent after the recent p95 latency. After enough consecutive
+    # failures the circuit opens and turns are answered locally until it resets
+    llm_attempt_timeout_seconds: float = 10
+    llm_total_timeout_seconds: float = 20
+    llm_retry_backoff_seconds: float = 0.25
+    llm_retry_backoff_max_seconds: float = 2
+    llm_hedge_enabled: bool = False
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_samples: int = 20
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30
+    
+    # LLM backend: "groq", "fake" (in-process stand-in), "record" or "replay" (llm_recording_dir)
+    llm_backend: str = "groq"
+    llm_fake_latency_ms: float = 200
+    llm_fake_jitter_ms: float = 0
+    llm_fake_script: Optional[str] = None
+    llm_recording_dir: str = "llm_recordings"
+    
+    # Answer unambiguous commands ("show my tasks", "complete task 1") without calling Groq
+    chat_fast_path_enabled: bool = True
+    
+    # Cache of the model's tool-call decisions for context-free messages (0 entries disables)
+    tool_decision_cache_ttl_seconds: float = 3600
+    tool_decision_cache_max_entries: int = 5000
+    
+    # Chat history sent to the LLM: the newest messages that fit the token budget
+    # (estimated at ~4 characters per token); older ones are folded into a rolling summary
+    chat_history_token_budget: int = 2000
+    chat_history_max_messages: int = 50
+    chat_summary_max_chars: int = 2000
     
     # Allowed origins for CORS
     ALLOWED_ORIGINS: List[str] = [
@@ -1,8 +1,14 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from .config.settings import settings
 from .models.user import User
 from .models.task import Task
 from .models.conversation import Conversation, Message
+from .models.refresh_token import RefreshToken
+from .services.search_service import ensure_search_index
 
 # Create the database engine with connection pooling
 engine = create_engine(
@@ -14,12 +20,69 @@ engine = create_engine(
     pool_recycle=3600
 )
 
+
+def get_async_database_url(database_url: str):
+    """Map the configured sync URL onto its async driver (asyncpg / aiosqlite)"""
+    url = make_url(database_url)
+    if url.get_backend_name() == "postgresql":
+        query = dict(url.query)
+        # asyncpg spells libpq's sslmode as ssl and has no channel_binding option
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode and "ssl" not in query:
+            query["ssl"] = sslmode
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+_async_url = get_async_database_url(settings.database_url)
+
+# Async engine used by the request path; sqlite has no QueuePool so only size Postgres pools
+async_engine = create_async_engine(
+    _async_url,
+    echo=True,
+    **(
+        dict(pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=3600)
+        if _async_url.get_backend_name() == "postgresql" else {}
+    )
+)
+
+def add_missing_columns(engine: Engine):
+    """create_all never alters existing tables, so add nullable columns introduced later"""
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(
+                        f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                    ))
+
+
 def create_db_and_tables():
     """Create database tables"""
     SQLModel.metadata.create_all(engine)
+    add_missing_columns(engine)
+    # create_all skips tables that already exist, so add indexes introduced later explicitly
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    ensure_search_index(engine)
     print("Database tables created successfully!")
 
 def get_session():
     """Get a database session"""
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_async_session():
+    """Get an async database session"""
+    # expire_on_commit=False so committed objects can still be serialized without a reload
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -2,9 +2,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .api.auth import router as auth_router
 from .api.tasks import router as tasks_router
-from .api.chat import router as chat_router
+from .api.chat import router as chat_router, todo_agent
 from .config.settings import settings
 from .database import create_db_and_tables
+from .services.task_cache import task_cache
+from .services.password_hasher import password_hasher
+from .services.intent_matcher import intent_matcher
+from .api.middleware.auth_middleware import token_cache
+from .api.middleware.rate_limit import RateLimitMiddleware, rate_limiter
 
 def create_app():
     # Create database tables
@@ -12,6 +17,9 @@ def create_app():
     
     app = FastAPI(title=settings.app_name, version=settings.version)
 
+    # Rate limiting; added before CORS so 429 responses still carry CORS headers
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
     # CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -19,6 +27,7 @@ def create_app():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "Retry-After"],
     )
 
     # Include routers
@@ -34,35 +43,25 @@ def create_app():
     def health_check():
         return {"status": "healthy", "timestamp": "2026-02-04T19:23:00Z"}
 
-    @app.get("/debug/tasks")
-    def debug_tasks():
-        """Debug endpoint to check database tasks"""
-        from .database import engine
-        from sqlmodel import Session, select
-        from .models.task import Task
-        
-        try:
-            with Session(engine) as session:
-                statement = select(Task)
-                tasks = session.exec(statement).all()
-                
-                task_list = []
-                for task in tasks:
-                    task_list.append({
-                        "id": str(task.id),
-                        "title": task.title,
-                        "description": task.description,
-                        "completed": task.completed,
-                        "user_id": str(task.user_id),
-                        "created_at": task.created_at.isoformat() if task.created_at else None
-                    })
-                
-                return {
-                    "total_tasks": len(task_list),
-                    "tasks": task_list
-                }
-        except Exception as e:
-            return {"error": str(e)}
+    @app.get("/metrics")
+    def metrics():
+        """Counters for the in-process caches and pools"""
+        return {
+            "task_cache": task_cache.stats(),
+            "password_hasher": password_hasher.stats(),
+            "jwt_cache": token_cache.stats(),
+            "intent_fast_path": intent_matcher.stats(),
+            "tool_decision_cache": todo_agent.decision_cache.stats(),
+            "llm_scheduler": todo_agent.scheduler.stats(),
+            "llm_resilience": todo_agent.resilience.stats(),
+            "llm_router": todo_agent.router.stats(),
+            "rate_limit": rate_limiter.stats() if rate_limiter is not None else {"enabled": False},
+        }
+
+    @app.on_event("shutdown")
+    async def shutdown_pools():
+        password_hasher.shutdown()
+        await todo_agent.aclose()
 
     return app
 
@@ -1,5 +1,10 @@
 from .user import User, UserRead, UserCreate, UserUpdate, UserPublic
-from .task import Task, TaskRead, TaskCreate, TaskUpdate, TaskToggleComplete
+from .task import (
+    Task, TaskRead, TaskCreate, TaskUpdate, TaskToggleComplete,
+    TaskBulkCreate, TaskBulkIds, TaskBulkComplete, TaskBulkItemResult, TaskBulkResult,
+    TaskImportError, TaskImportResult, TaskStats, TaskStatsRead
+)
+from .refresh_token import RefreshToken, RefreshRequest
 
 __all__ = [
     "User",
@@ -11,5 +16,16 @@ __all__ = [
     "TaskRead",
     "TaskCreate",
     "TaskUpdate",
-    "TaskToggleComplete"
+    "TaskToggleComplete",
+    "TaskBulkCreate",
+    "TaskBulkIds",
+    "TaskBulkComplete",
+    "TaskBulkItemResult",
+    "TaskBulkResult",
+    "TaskImportError",
+    "TaskImportResult",
+    "TaskStats",
+    "TaskStatsRead",
+    "RefreshToken",
+    "RefreshRequest"
 ]
\ No newline at end of file
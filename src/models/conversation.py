@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from datetime import datetime
 from typing import Optional, List
 from uuid import uuid4, UUID
@@ -9,16 +10,27 @@ PKT = pytz.timezone('Asia/Karachi')
 
 def get_pakistan_time():
     """Get current time in Pakistan timezone"""
-    return datetime.now(PKT)
+    # Naive wall-clock time: the columns are TIMESTAMP WITHOUT TIME ZONE, and asyncpg
+    # refuses to bind aware datetimes to them (psycopg2 silently dropped the offset)
+    return datetime.now(PKT).replace(tzinfo=None)
 
 
 class Conversation(SQLModel, table=True):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Keyset pagination: a user's conversations ordered by (updated_at, id)
+        Index("ix_conversations_user_updated_id", "user_id", "updated_at", "id"),
+    )
     
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
     user_id: str = Field(index=True)
     created_at: datetime = Field(default_factory=get_pakistan_time)
     updated_at: datetime = Field(default_factory=get_pakistan_time)
+    # Rolling summary of the messages that fell out of the history window, and the
+    # (created_at, id) of the last message folded into it
+    summary: Optional[str] = Field(default=None)
+    summary_until: Optional[datetime] = Field(default=None)
+    summary_until_id: Optional[UUID] = Field(default=None)
     
     # Relationship
     messages: List["Message"] = Relationship(back_populates="conversation")
@@ -26,6 +38,10 @@ class Conversation(SQLModel, table=True):
 
 class Message(SQLModel, table=True):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination and the history window: ordered by (created_at, id)
+        Index("ix_messages_conversation_created_id", "conversation_id", "created_at", "id"),
+    )
     
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
     conversation_id: UUID = Field(foreign_key="conversations.id", index=True)
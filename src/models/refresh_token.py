@@ -0,0 +1,26 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+import uuid
+
+
+class RefreshToken(SQLModel, table=True):
+    """
+    Server-side record of an issued refresh token. The client holds "<id>.<secret>";
+    only a SHA-256 of the secret is stored. Rotation chains tokens within a family
+    so a replayed (already rotated) token can revoke the whole chain.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="users.id", index=True, nullable=False)
+    family_id: uuid.UUID = Field(index=True, nullable=False)
+    token_hash: str = Field(max_length=64, nullable=False)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    expires_at: datetime = Field(nullable=False)
+    revoked_at: Optional[datetime] = Field(default=None)
+    replaced_by: Optional[uuid.UUID] = Field(default=None)
+
+
+class RefreshRequest(SQLModel):
+    refresh_token: str
@@ -1,5 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship
-from typing import Optional
+from sqlalchemy import Index
+from typing import Optional, List
 from datetime import datetime
 import uuid
 import pytz
@@ -10,7 +11,9 @@ PKT = pytz.timezone('Asia/Karachi')
 
 def get_pakistan_time():
     """Get current time in Pakistan timezone"""
-    return datetime.now(PKT)
+    # Naive wall-clock time: the columns are TIMESTAMP WITHOUT TIME ZONE, and asyncpg
+    # refuses to bind aware datetimes to them (psycopg2 silently dropped the offset)
+    return datetime.now(PKT).replace(tzinfo=None)
 
 
 class TaskBase(SQLModel):
@@ -21,6 +24,11 @@ class TaskBase(SQLModel):
 
 class Task(TaskBase, table=True):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Keyset pagination: (user_id[, completed]) equality, then ordered by (created_at, id)
+        Index("ix_tasks_user_completed_created_id", "user_id", "completed", "created_at", "id"),
+        Index("ix_tasks_user_created_id", "user_id", "created_at", "id"),
+    )
     
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="users.id", nullable=False)
@@ -31,6 +39,24 @@ class Task(TaskBase, table=True):
     user: User = Relationship(back_populates="tasks")
 
 
+class TaskStats(SQLModel, table=True):
+    """Per-user task counters, maintained by task_service in the same transaction as each write"""
+    __tablename__ = "task_stats"
+    
+    user_id: uuid.UUID = Field(foreign_key="users.id", primary_key=True)
+    total: int = Field(default=0, nullable=False)
+    completed: int = Field(default=0, nullable=False)
+    # Bumped by every task write; doubles as the per-user ETag version
+    version: int = Field(default=0, nullable=False)
+    updated_at: datetime = Field(default_factory=get_pakistan_time, nullable=False)
+
+
+class TaskStatsRead(SQLModel):
+    total: int
+    completed: int
+    pending: int
+
+
 class TaskRead(TaskBase):
     id: uuid.UUID
     user_id: uuid.UUID
@@ -49,4 +75,36 @@ class TaskUpdate(SQLModel):
 
 
 class TaskToggleComplete(SQLModel):
-    completed: bool
\ No newline at end of file
+    completed: bool
+
+
+class TaskBulkCreate(SQLModel):
+    tasks: List[TaskCreate]
+
+
+class TaskBulkIds(SQLModel):
+    task_ids: List[uuid.UUID]
+
+
+class TaskBulkComplete(TaskBulkIds):
+    completed: bool = True
+
+
+class TaskBulkItemResult(SQLModel):
+    id: uuid.UUID
+    status: str  # "created", "updated", "deleted" or "not_found"
+
+
+class TaskBulkResult(SQLModel):
+    results: List[TaskBulkItemResult]
+
+
+class TaskImportError(SQLModel):
+    line: int
+    error: str
+
+
+class TaskImportResult(SQLModel):
+    imported: int
+    errors: List[TaskImportError]
+    aborted: Optional[str] = None  # why the import stopped early, if it did
\ No newline at end of file
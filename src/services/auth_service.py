@@ -1,11 +1,19 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from uuid import UUID, uuid4
+import hashlib
+import hmac
+import secrets
 from sqlmodel import Session, select
+from sqlalchemy import update
+from sqlmodel.ext.asyncio.session import AsyncSession
 import bcrypt
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 from ..models.user import User, UserCreate
+from ..models.refresh_token import RefreshToken
 from ..config.settings import settings
+from .password_hasher import password_hasher
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -33,6 +41,82 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def _hash_refresh_secret(secret: str) -> str:
+    # The secret is 256 random bits, so a fast hash is enough; bcrypt would defeat the purpose
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+
+def create_refresh_token(session: Session, user_id: str, family_id: Optional[UUID] = None) -> str:
+    """Store a new refresh token and return the "<id>.<secret>" string for the client"""
+    secret = secrets.token_urlsafe(32)
+    token = RefreshToken(
+        id=uuid4(),
+        user_id=UUID(str(user_id)),
+        family_id=family_id or uuid4(),
+        token_hash=_hash_refresh_secret(secret),
+        expires_at=datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days),
+    )
+    session.add(token)
+    session.flush()
+    return f"{token.id}.{secret}"
+
+
+def _lookup_refresh_token(session: Session, refresh_token: str) -> Optional[RefreshToken]:
+    """Find the stored token by id (primary key) and check its secret"""
+    token_id, _, secret = refresh_token.partition(".")
+    try:
+        token_id = UUID(token_id)
+    except ValueError:
+        return None
+    stored = session.get(RefreshToken, token_id)
+    if not stored or not hmac.compare_digest(stored.token_hash, _hash_refresh_secret(secret)):
+        return None
+    return stored
+
+
+def _revoke_family(session: Session, family_id: UUID):
+    session.exec(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+def rotate_refresh_token(session: Session, refresh_token: str) -> Optional[Tuple[str, str]]:
+    """
+    Exchange a refresh token for a new one in the same family; returns (user_id, new token).
+    Presenting an already-rotated token means it leaked, so the whole family is revoked.
+    """
+    stored = _lookup_refresh_token(session, refresh_token)
+    if not stored or stored.expires_at <= datetime.utcnow():
+        return None
+    # Conditional UPDATE so two concurrent refreshes cannot both rotate the same token
+    revoked = session.exec(
+        update(RefreshToken)
+        .where(RefreshToken.id == stored.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    ).rowcount
+    if not revoked:
+        _revoke_family(session, stored.family_id)
+        session.flush()
+        return None
+    new_token = create_refresh_token(session, str(stored.user_id), stored.family_id)
+    stored.replaced_by = UUID(new_token.partition(".")[0])
+    session.add(stored)
+    session.flush()
+    return str(stored.user_id), new_token
+
+
+def revoke_refresh_token(session: Session, refresh_token: str) -> bool:
+    """Revoke the token's whole family (logout); False if the token is unknown"""
+    stored = _lookup_refresh_token(session, refresh_token)
+    if not stored:
+        return False
+    _revoke_family(session, stored.family_id)
+    session.flush()
+    return True
+
+
 def authenticate_user(session: Session, email: str, password: str) -> Optional[User]:
     statement = select(User).where(User.email == email)
     user = session.exec(statement).first()
@@ -52,4 +136,40 @@ def create_user(session: Session, user_create: UserCreate) -> User:
     session.add(db_user)
     session.commit()
     session.refresh(db_user)
-    return db_user
\ No newline at end of file
+    return db_user
+
+
+# Async variants for the AsyncSession request path. bcrypt runs in the dedicated
+# password_hasher process pool, which raises PasswordHasherBusy when saturated.
+
+async def get_user_by_email_async(session: AsyncSession, email: str) -> Optional[User]:
+    statement = select(User).where(User.email == email)
+    return (await session.exec(statement)).first()
+
+
+async def authenticate_user_async(session: AsyncSession, email: str, password: str) -> Optional[User]:
+    user = await get_user_by_email_async(session, email)
+    if not user or not await password_hasher.run(verify_password, password, user.password):
+        return None
+    return user
+
+
+async def create_user_async(session: AsyncSession, user_create: UserCreate) -> User:
+    hashed_password = await password_hasher.run(hash_password, user_create.password)
+    db_user = User(email=user_create.email, password=hashed_password)
+    session.add(db_user)
+    await session.commit()
+    await session.refresh(db_user)
+    return db_user
+
+
+async def create_refresh_token_async(session: AsyncSession, user_id: str, family_id: Optional[UUID] = None) -> str:
+    return await session.run_sync(create_refresh_token, user_id, family_id)
+
+
+async def rotate_refresh_token_async(session: AsyncSession, refresh_token: str) -> Optional[Tuple[str, str]]:
+    return await session.run_sync(rotate_refresh_token, refresh_token)
+
+
+async def revoke_refresh_token_async(session: AsyncSession, refresh_token: str) -> bool:
+    return await session.run_sync(revoke_refresh_token, refresh_token)
@@ -1,10 +1,52 @@
 from sqlmodel import Session, select
-from typing import List, Optional
-from uuid import UUID
-from ..models.conversation import Conversation, Message
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import inspect, insert, tuple_, update
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+from ..config.settings import settings
+from ..models.conversation import Conversation, Message, get_pakistan_time
+from .pagination import InvalidCursor, decode_cursor
 from ..models.task import Task
 
 
+def _keyset_page(session: Session, statement, timestamp_col, id_col, limit: int,
+                 before: Optional[str], after: Optional[str], newest_first: bool) -> list:
+    """
+    One page of `statement` ordered by (timestamp, id). `before` pages towards older rows
+    and `after` towards newer ones; without a cursor the page starts at the newest rows.
+    Rows come back newest-first or oldest-first as asked, whichever way the page was read.
+    """
+    if before and after:
+        raise InvalidCursor("Pass either before or after, not both")
+    key = tuple_(timestamp_col, id_col)
+    if after:
+        timestamp, row_id = decode_cursor(after)
+        statement = statement.where(key > tuple_(timestamp, row_id)).order_by(timestamp_col, id_col)
+    else:
+        if before:
+            timestamp, row_id = decode_cursor(before)
+            statement = statement.where(key < tuple_(timestamp, row_id))
+        statement = statement.order_by(timestamp_col.desc(), id_col.desc())
+    rows = session.exec(statement.limit(limit)).all()
+    if bool(after) == newest_first:
+        rows = list(reversed(rows))
+    return rows
+
+
+class ChatTurn:
+    """What the read phase of a chat turn hands to its write phase"""
+
+    def __init__(self, conversation_id: UUID, is_new: bool, history: List[Dict[str, str]],
+                 summary_update: Dict[str, Any]):
+        self.conversation_id = conversation_id
+        self.is_new = is_new
+        self.history = history
+        # Rolling-summary columns changed by get_history_window, written with the turn
+        self.summary_update = summary_update
+        self.started_at = get_pakistan_time()
+
+
 class ConversationService:
     @staticmethod
     def get_or_create_conversation(session: Session, user_id: str, conversation_id: Optional[UUID] = None) -> Conversation:
@@ -34,6 +76,97 @@ class ConversationService:
         ).all()
         return messages
     
+    @staticmethod
+    def list_conversations_page(session: Session, user_id: str, limit: int = 50,
+                                before: Optional[str] = None, after: Optional[str] = None) -> List[Conversation]:
+        """Page of the user's conversations, most recently updated first"""
+        statement = select(Conversation).where(Conversation.user_id == user_id)
+        return _keyset_page(session, statement, Conversation.updated_at, Conversation.id,
+                            limit, before, after, newest_first=True)
+
+    @staticmethod
+    def get_messages_page(session: Session, conversation_id: UUID, limit: int = 50,
+                          before: Optional[str] = None, after: Optional[str] = None) -> List[Message]:
+        """Page of a conversation's messages in chronological order (the latest page by default)"""
+        statement = select(Message).where(Message.conversation_id == conversation_id)
+        return _keyset_page(session, statement, Message.created_at, Message.id,
+                            limit, before, after, newest_first=False)
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token count (~4 characters per token plus per-message overhead)"""
+        return len(text) // 4 + 4
+
+    @staticmethod
+    def _summary_line(message: Message) -> str:
+        content = " ".join(message.content.split())
+        if len(content) > 200:
+            content = content[:197] + "..."
+        return f"{message.role.capitalize()}: {content}"
+
+    @staticmethod
+    def get_history_window(session: Session, conversation_id: UUID) -> List[Dict[str, str]]:
+        """
+        Build the history to send to the LLM: the newest messages that fit
+        settings.chat_history_token_budget, preceded by the conversation's rolling summary.
+        Messages that slid out of the window since the last turn are folded into the
+        summary, so each turn only reads the window plus the newly dropped messages.
+        """
+        conversation = session.get(Conversation, conversation_id)
+        unsummarized = Message.conversation_id == conversation_id
+        if conversation.summary_until is not None:
+            unsummarized = unsummarized & (
+                tuple_(Message.created_at, Message.id)
+                > tuple_(conversation.summary_until, conversation.summary_until_id)
+            )
+
+        newest = session.exec(
+            select(Message).where(unsummarized)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(settings.chat_history_max_messages)
+        ).all()
+
+        window: List[Message] = []
+        tokens = 0
+        for message in newest:
+            tokens += ConversationService.estimate_tokens(message.content)
+            if window and tokens > settings.chat_history_token_budget:
+                break
+            window.append(message)
+        window.reverse()
+
+        if window:
+            oldest = window[0]
+            dropped = session.exec(
+                select(Message).where(
+                    unsummarized,
+                    tuple_(Message.created_at, Message.id) < tuple_(oldest.created_at, oldest.id),
+                )
+                .order_by(Message.created_at, Message.id)
+            ).all()
+            if dropped:
+                lines = [conversation.summary] if conversation.summary else []
+                lines.extend(ConversationService._summary_line(message) for message in dropped)
+                summary = "\n".join(lines)
+                if len(summary) > settings.chat_summary_max_chars:
+                    # Rolling: keep the most recent lines
+                    summary = summary[-settings.chat_summary_max_chars:]
+                    summary = summary[summary.find("\n") + 1:] if "\n" in summary else summary
+                conversation.summary = summary
+                conversation.summary_until = dropped[-1].created_at
+                conversation.summary_until_id = dropped[-1].id
+                # Written on the caller's commit (or by save_turn)
+                session.add(conversation)
+
+        history = []
+        if conversation.summary:
+            history.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{conversation.summary}",
+            })
+        history.extend({"role": msg.role, "content": msg.content} for msg in window)
+        return history
+
     @staticmethod
     def add_message(session: Session, conversation_id: UUID, user_id: str, role: str, content: str) -> Message:
         """Add a message to conversation"""
@@ -52,3 +185,95 @@ class ConversationService:
         
         session.flush()
         return message
+
+    @staticmethod
+    def begin_turn(session: Session, user_id: str, conversation_id: Optional[UUID] = None) -> ChatTurn:
+        """
+        Read phase of a chat turn: resolve the conversation and build the history window,
+        then end the transaction so no connection is held while the LLM answers. A new
+        conversation only gets an id here; save_turn inserts it.
+        """
+        conversation = None
+        if conversation_id:
+            conversation = session.exec(
+                select(Conversation).where(
+                    Conversation.id == conversation_id,
+                    Conversation.user_id == user_id
+                )
+            ).first()
+        if conversation is None:
+            turn = ChatTurn(uuid4(), True, [], {})
+        else:
+            history = ConversationService.get_history_window(session, conversation.id)
+            state = inspect(conversation)
+            summary_update = {
+                name: getattr(conversation, name)
+                for name in ("summary", "summary_until", "summary_until_id")
+                if state.attrs[name].history.has_changes()
+            }
+            turn = ChatTurn(conversation.id, False, history, summary_update)
+        session.rollback()
+        return turn
+
+    @staticmethod
+    def save_turn(session: Session, turn: ChatTurn, user_id: str, user_content: str, assistant_content: str):
+        """
+        Write phase of a chat turn: both messages in one batched INSERT, plus one INSERT
+        (new conversation) or UPDATE (updated_at and any summary change) of the
+        conversation. The caller commits.
+        """
+        # Strictly after the user message, so (created_at, id) ordering holds
+        replied_at = max(get_pakistan_time(), turn.started_at + timedelta(microseconds=1))
+        if turn.is_new:
+            session.exec(insert(Conversation), params=[{
+                "id": turn.conversation_id, "user_id": user_id,
+                "created_at": turn.started_at, "updated_at": replied_at,
+            }])
+        else:
+            session.exec(
+                update(Conversation).where(Conversation.id == turn.conversation_id)
+                .values(updated_at=replied_at, **turn.summary_update)
+                .execution_options(synchronize_session=False)
+            )
+        session.exec(insert(Message), params=[
+            {"id": uuid4(), "conversation_id": turn.conversation_id, "user_id": user_id,
+             "role": "user", "content": user_content, "created_at": turn.started_at},
+            {"id": uuid4(), "conversation_id": turn.conversation_id, "user_id": user_id,
+             "role": "assistant", "content": assistant_content, "created_at": replied_at},
+        ])
+
+    # Async variants; see task_service for why these delegate through run_sync
+
+    @staticmethod
+    async def get_or_create_conversation_async(session: AsyncSession, user_id: str, conversation_id: Optional[UUID] = None) -> Conversation:
+        return await session.run_sync(ConversationService.get_or_create_conversation, user_id, conversation_id)
+
+    @staticmethod
+    async def get_conversation_history_async(session: AsyncSession, conversation_id: UUID) -> List[Message]:
+        return await session.run_sync(ConversationService.get_conversation_history, conversation_id)
+
+    @staticmethod
+    async def list_conversations_page_async(session: AsyncSession, user_id: str, limit: int = 50,
+                                            before: Optional[str] = None, after: Optional[str] = None) -> List[Conversation]:
+        return await session.run_sync(ConversationService.list_conversations_page, user_id, limit, before, after)
+
+    @staticmethod
+    async def get_messages_page_async(session: AsyncSession, conversation_id: UUID, limit: int = 50,
+                                      before: Optional[str] = None, after: Optional[str] = None) -> List[Message]:
+        return await session.run_sync(ConversationService.get_messages_page, conversation_id, limit, before, after)
+
+    @staticmethod
+    async def get_history_window_async(session: AsyncSession, conversation_id: UUID) -> List[Dict[str, str]]:
+        return await session.run_sync(ConversationService.get_history_window, conversation_id)
+
+    @staticmethod
+    async def begin_turn_async(session: AsyncSession, user_id: str, conversation_id: Optional[UUID] = None) -> ChatTurn:
+        return await session.run_sync(ConversationService.begin_turn, user_id, conversation_id)
+
+    @staticmethod
+    async def save_turn_async(session: AsyncSession, turn: ChatTurn, user_id: str, user_content: str, assistant_content: str):
+        await session.run_sync(ConversationService.save_turn, turn, user_id, user_content, assistant_content)
+
+    @staticmethod
+    async def add_message_async(session: AsyncSession, conversation_id: UUID, user_id: str, role: str, content: str) -> Message:
+        return await session.run_sync(ConversationService.add_message, conversation_id, user_id, role, content)
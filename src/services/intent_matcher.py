@@ -0,0 +1,131 @@
+import re
+import time
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+# tool name, tool args
+IntentMatch = Tuple[str, Dict[str, Any]]
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+_ORDINALS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10,
+    "1st": 1, "2nd": 2, "3rd": 3, "4th": 4, "5th": 5, "6th": 6, "7th": 7, "8th": 8, "9th": 9, "10th": 10,
+}
+
+_NUMBER = r"(?P<number>\d{1,4}|" + "|".join(_NUMBER_WORDS) + ")"
+_ORDINAL = r"(?P<ordinal>" + "|".join(_ORDINALS) + ")"
+# "task 1", "task #1", "task number 1", "1", "the first task", "the 2nd one"
+_TASK_REF = rf"(?:(?:task\s+)?(?:number\s+|no\.?\s*|#)?{_NUMBER}|the\s+{_ORDINAL}\s+(?:task|one|item))"
+_DONE = r"(?:done|complete|completed|finished)"
+_LIST_NAME = r"(?:(?:my\s+)?(?:todo\s+|to-do\s+)?list)"
+
+# Full-message patterns only: anything with extra words goes to the LLM
+_PATTERNS: List[Tuple[str, Pattern]] = [
+    ("list_tasks", re.compile(
+        rf"^(?:please\s+)?(?:show|list|display|view|get)(?:\s+me)?(?:\s+all)?(?:\s+of)?(?:\s+my)?"
+        rf"\s+(?:tasks|todos|to-dos|{_LIST_NAME})$"
+    )),
+    ("list_tasks", re.compile(rf"^what(?:'s|\s+is)\s+on\s+{_LIST_NAME}$")),
+    ("list_tasks", re.compile(r"^(?:what\s+are\s+)?my\s+(?:tasks|todos)$")),
+    ("complete_task", re.compile(rf"^(?:please\s+)?(?:complete|finish|check\s+off)\s+{_TASK_REF}$")),
+    ("complete_task", re.compile(rf"^(?:please\s+)?mark\s+{_TASK_REF}\s+(?:as\s+)?{_DONE}$")),
+    ("delete_task", re.compile(rf"^(?:please\s+)?(?:delete|remove)\s+{_TASK_REF}$")),
+    ("add_task", re.compile(
+        rf"^(?:please\s+)?add\s+(?:a\s+)?(?:new\s+)?(?:task\s*(?:called\s+|named\s+|:\s*)?)?"
+        rf"(?P<title>[^?]+?)(?:\s+to\s+{_LIST_NAME})?$"
+    )),
+]
+
+# A second command inside an add ("add milk and then show my tasks") needs the LLM
+_CHAINED_COMMAND = re.compile(
+    r"\b(?:and|then)\s+(?:then\s+)?(?:show|list|complete|finish|mark|delete|remove|add|update|change)\b"
+)
+# "add a note to task 2", "add 5 minutes to the first task": an update, not a new task
+_ADD_TO_TASK = re.compile(
+    r"\bto\s+(?:task\s+(?:number\s+|no\.?\s*|#)?(?:\d{1,4}|" + "|".join(_NUMBER_WORDS) + r")\b|#\d+"
+    r"|the\s+(?:" + "|".join(_ORDINALS) + r")\s+(?:task|one|item)\b|\d{1,4}$)"
+)
+# Titles that mean the user has not actually said what to add
+_VAGUE_TITLES = {"a task", "task", "tasks", "something", "it", "this", "that", "one", "new task"}
+
+
+def normalize_message(message: str) -> str:
+    return " ".join(message.strip().rstrip(".!?").split()).lower()
+
+
+def _task_number(match: re.Match) -> Optional[str]:
+    number = match.group("number")
+    if number is not None:
+        value = _NUMBER_WORDS.get(number) or int(number)
+    else:
+        value = _ORDINALS[match.group("ordinal")]
+    return str(value) if value >= 1 else None
+
+
+class IntentMatcher:
+    """
+    Deterministic matcher for unambiguous chat commands ("show my tasks", "complete
+    task 1", "delete the second task", "add buy milk"). A hit maps straight to an
+    MCPTools call; anything else returns None and goes to the LLM.
+    """
+
+    def __init__(self, patterns: List[Tuple[str, Pattern]] = _PATTERNS):
+        self.patterns = patterns
+        self.checked = 0
+        self.matched: Dict[str, int] = {}
+        self.total_seconds = 0.0
+
+    def match(self, message: str) -> Optional[IntentMatch]:
+        started = time.perf_counter()
+        try:
+            return self._match(message)
+        finally:
+            self.checked += 1
+            self.total_seconds += time.perf_counter() - started
+
+    def _match(self, message: str) -> Optional[IntentMatch]:
+        text = normalize_message(message)
+        for tool, pattern in self.patterns:
+            match = pattern.match(text)
+            if not match:
+                continue
+            if tool == "list_tasks":
+                args = {}
+            elif tool == "add_task":
+                # Keep the user's own casing for the title
+                title = match.group("title")
+                original = " ".join(message.strip().rstrip(".!?").split())
+                if len(original) == len(text):
+                    start = text.index(title)
+                    title = original[start:start + len(title)]
+                title = title.strip(" \"'")
+                if (not title or title.lower() in _VAGUE_TITLES or "?" in message
+                        or _CHAINED_COMMAND.search(text) or _ADD_TO_TASK.search(text)):
+                    return None
+                args = {"title": title}
+            else:
+                task_id = _task_number(match)
+                if task_id is None:
+                    return None
+                args = {"task_id": task_id}
+            self.matched[tool] = self.matched.get(tool, 0) + 1
+            return tool, args
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        hits = sum(self.matched.values())
+        return {
+            "checked": self.checked,
+            "matched": hits,
+            "fallbacks": self.checked - hits,
+            "match_rate": hits / self.checked if self.checked else 0.0,
+            "avg_match_us": self.total_seconds / self.checked * 1e6 if self.checked else 0.0,
+            "by_tool": dict(self.matched),
+        }
+
+
+intent_matcher = IntentMatcher()
+
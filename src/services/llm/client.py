@@ -0,0 +1,44 @@
+import httpx
+from groq import AsyncGroq
+from ...config.settings import settings
+from .fake_groq import create_fake_groq_app, load_script
+from .recorder import RecordingTransport
+
+
+def build_llm_client(backend: str) -> AsyncGroq:
+    """
+    AsyncGroq client for settings.llm_backend: "groq" (the API, or groq_base_url),
+    "fake" (in-process stand-in server), "record" (Groq, saving every exchange to
+    llm_recording_dir) or "replay" (answers only from llm_recording_dir).
+    """
+    # One pooled httpx client per process, so chat turns reuse keep-alive
+    # connections instead of paying a TLS handshake each time
+    timeout = httpx.Timeout(settings.groq_timeout_seconds, connect=settings.groq_connect_timeout_seconds)
+    limits = httpx.Limits(
+        max_connections=settings.groq_max_connections,
+        max_keepalive_connections=settings.groq_max_connections,
+    )
+    base_url = settings.groq_base_url
+    if backend == "groq":
+        transport = httpx.AsyncHTTPTransport(limits=limits)
+    elif backend == "fake":
+        app = create_fake_groq_app(
+            settings.llm_fake_latency_ms, settings.llm_fake_jitter_ms, script=load_script(settings.llm_fake_script)
+        )
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://fake-groq"
+    elif backend == "record":
+        transport = RecordingTransport(settings.llm_recording_dir, "record", httpx.AsyncHTTPTransport(limits=limits))
+    elif backend == "replay":
+        transport = RecordingTransport(settings.llm_recording_dir, "replay")
+    else:
+        raise ValueError(f"Unknown LLM backend: {backend}")
+
+    return AsyncGroq(
+        api_key=settings.groq_api_key,
+        base_url=base_url,
+        timeout=timeout,
+        # Retries, with their deadline and backoff, are done by ResilientCaller
+        max_retries=0,
+        http_client=httpx.AsyncClient(timeout=timeout, transport=transport),
+    )
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Rules are tried in order against the last user message (lower-cased). Tool call
+# argument strings are formatted with the rule's named groups.
+DEFAULT_SCRIPT: List[Dict[str, Any]] = [
+    {"match": r"^(?:please )?add (?P<title>.+?)(?: to my list)?$",
+     "tool_calls": [{"name": "add_task", "arguments": {"title": "{title}"}}]},
+    {"match": r"\b(?:show|list|what'?s on)\b",
+     "tool_calls": [{"name": "list_tasks", "arguments": {}}]},
+    {"match": r"\b(?:complete|finish|done)\b\D*(?P<task_id>\d+)",
+     "tool_calls": [{"name": "complete_task", "arguments": {"task_id": "{task_id}"}}]},
+    {"match": r"\b(?:delete|remove)\b\D*(?P<task_id>\d+)",
+     "tool_calls": [{"name": "delete_task", "arguments": {"task_id": "{task_id}"}}]},
+    {"match": r"", "content": "I'm a stand-in model. Ask me to add, list, complete or delete tasks."},
+]
+
+
+class FakeGroqScript:
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.rules = [(re.compile(rule.get("match", "")), rule) for rule in rules]
+
+    def respond(self, message: str) -> Dict[str, Any]:
+        """Pick the first matching rule: {"content": ...} or {"tool_calls": [...]}"""
+        text = message.strip().lower()
+        for pattern, rule in self.rules:
+            match = pattern.search(text)
+            if not match:
+                continue
+            groups = {key: value or "" for key, value in match.groupdict().items()}
+            if "tool_calls" in rule:
+                return {"tool_calls": [
+                    {
+                        "name": call["name"],
+                        "arguments": json.dumps({
+                            key: value.format(**groups) if isinstance(value, str) else value
+                            for key, value in call.get("arguments", {}).items()
+                        }),
+                    }
+                    for call in rule["tool_calls"]
+                ]}
+            return {"content": rule.get("content", "")}
+        return {"content": ""}
+
+
+def _last_user_message(messages: List[Dict[str, Any]]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return message.get("content") or ""
+    return ""
+
+
+def create_fake_groq_app(latency_ms: float = 200, jitter_ms: float = 0, token_delay_ms: float = 5,
+                         script: Optional[List[Dict[str, Any]]] = None) -> FastAPI:
+    """
+    A Groq-compatible /openai/v1/chat/completions server (plain and streaming) that
+    answers from a rule script after a configurable delay, for load tests without quota.
+    """
+    app = FastAPI(title="Fake Groq")
+    rules = FakeGroqScript(script or DEFAULT_SCRIPT)
+    app.state.requests = 0
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        reply = rules.respond(_last_user_message(body.get("messages", [])))
+        await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "fake")
+        tool_calls = [
+            {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function", "function": call}
+            for call in reply.get("tool_calls", [])
+        ]
+        content = reply.get("content")
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in body.get("messages", [])) // 4
+        completion_tokens = len(content or json.dumps(tool_calls)) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content, "tool_calls": tool_calls or None},
+                    "logprobs": None,
+                    "finish_reason": finish_reason,
+                }],
+                "usage": usage,
+            })
+
+        def chunk(delta: Dict[str, Any], finish: Optional[str] = None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish}],
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            if tool_calls:
+                yield chunk({"tool_calls": [dict(call, index=i) for i, call in enumerate(tool_calls)]})
+            else:
+                for word in re.findall(r"\S+\s*", content or ""):
+                    await asyncio.sleep(token_delay_ms / 1000)
+                    yield chunk({"content": word})
+            yield chunk({}, finish_reason)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def load_script(path: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    """Run the stand-in server: python -m src.services.llm.fake_groq --port 8100"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--token-delay-ms", type=float, default=5)
+    parser.add_argument("--script", help="JSON list of rules; see DEFAULT_SCRIPT")
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_fake_groq_app(args.latency_ms, args.jitter_ms, args.token_delay_ms, load_script(args.script))
+    print(f"Point the API at it with GROQ_BASE_URL=http://{args.host}:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
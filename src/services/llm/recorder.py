@@ -0,0 +1,83 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Optional
+import httpx
+
+
+class RecordingMissing(Exception):
+    """Raised in replay mode for a request that was never recorded"""
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport for the LLM client that records request/response pairs to
+    `directory` ("record", forwarding to `inner`) or serves them back from it
+    ("replay", no network). Requests are keyed by a hash of method, path and the
+    canonical JSON body, so replaying the same conversation is deterministic.
+    Only bodies are stored; request headers (the API key) never touch disk.
+    """
+
+    def __init__(self, directory: str, mode: str, inner: Optional[httpx.AsyncBaseTransport] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown recording mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.inner = inner or httpx.AsyncHTTPTransport()
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+
+    @staticmethod
+    def request_key(request: httpx.Request, body: bytes) -> str:
+        try:
+            canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+        except ValueError:
+            canonical = body.decode("utf-8", "replace")
+        digest = hashlib.sha256(f"{request.method} {request.url.path}\n{canonical}".encode("utf-8"))
+        return digest.hexdigest()[:32]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        path = self.directory / f"{self.request_key(request, body)}.json"
+
+        if self.mode == "replay":
+            if not path.exists():
+                self.missing += 1
+                raise RecordingMissing(f"No recording for {request.method} {request.url.path} ({path.name})")
+            with open(path, encoding="utf-8") as f:
+                recording = json.load(f)
+            self.replayed += 1
+            return httpx.Response(
+                recording["status"],
+                headers={"content-type": recording["content_type"]},
+                content=recording["body"].encode("utf-8"),
+                request=request,
+            )
+
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        content_type = response.headers.get("content-type", "application/json")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "request": json.loads(body) if body else None,
+                "status": response.status_code,
+                "content_type": content_type,
+                "body": content.decode("utf-8"),
+                "elapsed_ms": (time.perf_counter() - started) * 1000,
+            }, f, indent=2)
+        self.recorded += 1
+        # The body is already decoded, so drop encoding/length headers from the copy
+        return httpx.Response(
+            response.status_code,
+            headers={"content-type": content_type},
+            content=content,
+            request=request,
+        )
+
+    async def aclose(self):
+        await self.inner.aclose()
@@ -0,0 +1,244 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import groq
+from ...config.settings import settings
+
+# Reserves capacity for a hedged request: returns its release callback, or None to skip the hedge
+HedgeReservation = Callable[[], Awaitable[Optional[Callable[[], None]]]]
+
+# Failures worth another attempt: the provider was slow, unreachable, overloaded or broken
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    groq.APITimeoutError,
+    groq.APIConnectionError,
+    groq.RateLimitError,
+    groq.InternalServerError,
+)
+
+
+class CircuitOpen(Exception):
+    """Raised without calling the provider while the circuit breaker is open"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("LLM provider circuit is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls and short-circuits
+    everything for `reset_seconds`. Then one trial call is let through (half-open):
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.short_circuited = 0
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go to the provider now"""
+        if self.failure_threshold <= 0 or self.state == "closed":
+            return
+        remaining = self.opened_at + self.reset_seconds - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+            return
+        self.short_circuited += 1
+        # Half-open: a trial call is already in flight
+        raise CircuitOpen(max(remaining, 1.0))
+
+    def abandon_trial(self):
+        """The half-open trial was cancelled before it finished; let the next call try"""
+        if self.state == "half_open":
+            self.state = "open"
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.state = "closed"
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or (
+            self.failure_threshold > 0 and self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.state != "open":
+                self.opens += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opens": self.opens,
+            "short_circuited": self.short_circuited,
+        }
+
+
+class ResilientCaller:
+    """
+    Runs one provider request under a total deadline: each attempt gets its own
+    timeout, retryable failures are retried with full-jitter exponential backoff,
+    and (optionally) a second, hedged copy of an attempt is sent once it has taken
+    longer than the recent p95 latency; whichever answers first wins.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, attempt_timeout: float, total_timeout: float,
+                 max_retries: int, backoff_base: float, backoff_max: float,
+                 hedge_enabled: bool = False, hedge_percentile: float = 0.95, hedge_min_samples: int = 20):
+        self.breaker = breaker
+        self.attempt_timeout = attempt_timeout
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies: Deque[float] = deque(maxlen=500)
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+        self.fallbacks: Dict[str, int] = {}
+
+    def note_fallback(self, kind: str):
+        """Count a turn answered without the provider ("local" command or "degraded" reply)"""
+        self.fallbacks[kind] = self.fallbacks.get(kind, 0) + 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None until enough latencies are known"""
+        if not self.hedge_enabled or len(self.latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))]
+
+    def _backoff(self, retry: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry))
+
+    async def _attempt(self, request: Callable[[], Awaitable[Any]], timeout: float,
+                       reserve_hedge: Optional[HedgeReservation]) -> Any:
+        self.attempts += 1
+        started = time.monotonic()
+        delay = self.hedge_delay() if reserve_hedge is not None else None
+        if delay is None or delay >= timeout:
+            result = await asyncio.wait_for(request(), timeout)
+            self.latencies.append(time.monotonic() - started)
+            return result
+
+        primary = asyncio.ensure_future(request())
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            release = None if done else await reserve_hedge()
+            if release is not None:
+                self.hedges += 1
+                hedge = asyncio.ensure_future(request())
+                # Hand the capacity back however the hedge ends (answer, error or cancel)
+                hedge.add_done_callback(lambda _: release())
+                pending.add(hedge)
+            elif not done:
+                self.hedges_skipped += 1
+            deadline = started + timeout
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        self.latencies.append(time.monotonic() - started)
+                        return task.result()
+                if not pending:
+                    # Both copies failed; report the primary's error
+                    raise primary.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, request: Callable[[], Awaitable[Any]],
+                   reserve_hedge: Optional[HedgeReservation] = None) -> Any:
+        """
+        Await `request()` (a fresh coroutine per attempt). Pass `reserve_hedge` to allow
+        hedged requests: it is awaited right before a hedge would be sent and returns a
+        release callback for the capacity it took, or None to skip the hedge. Raises
+        CircuitOpen, the last attempt's error, or asyncio.TimeoutError.
+        """
+        self.breaker.before_call()
+        self.calls += 1
+        deadline = time.monotonic() + self.total_timeout
+        retry = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                result = await self._attempt(request, min(self.attempt_timeout, remaining), reserve_hedge)
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, (asyncio.TimeoutError, groq.APITimeoutError)):
+                    self.timeouts += 1
+                backoff = self._backoff(retry)
+                if retry >= self.max_retries or time.monotonic() + backoff >= deadline:
+                    self.failures += 1
+                    self.breaker.record_failure()
+                    raise
+                print(f"LLM attempt {retry + 1} failed ({type(e).__name__}), retrying in {backoff:.2f}s")
+                retry += 1
+                self.retries += 1
+                await asyncio.sleep(backoff)
+                continue
+            except asyncio.CancelledError:
+                self.breaker.abandon_trial()
+                raise
+            except Exception:
+                # A bad request is our fault, not the provider's: no retry, no breaker
+                self.failures += 1
+                if self.breaker.state == "half_open":
+                    # The provider did answer
+                    self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedges_skipped": self.hedges_skipped,
+            "hedge_delay_seconds": delay,
+            "fallbacks": dict(self.fallbacks),
+            "circuit": self.breaker.stats(),
+        }
+
+
+def build_resilient_caller() -> ResilientCaller:
+    return ResilientCaller(
+        CircuitBreaker(settings.llm_circuit_failure_threshold, settings.llm_circuit_reset_seconds),
+        attempt_timeout=settings.llm_attempt_timeout_seconds,
+        total_timeout=settings.llm_total_timeout_seconds,
+        max_retries=settings.groq_max_retries,
+        backoff_base=settings.llm_retry_backoff_seconds,
+        backoff_max=settings.llm_retry_backoff_max_seconds,
+        hedge_enabled=settings.llm_hedge_enabled,
+        hedge_percentile=settings.llm_hedge_percentile,
+        hedge_min_samples=settings.llm_hedge_min_samples,
+    )
@@ -0,0 +1,82 @@
+import re
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from ...config.settings import settings
+
+# Several commands in one message ("add milk, then complete task 2")
+_MULTI_STEP = re.compile(r"\b(?:and then|then|after that|also|as well as)\b|[;\n]|,\s*(?:and\s+)?(?:add|complete|delete|remove|update|change|mark|show|list)\b")
+# Words that only make sense against the conversation so far ("delete it", "that one")
+_REFERENCE = re.compile(r"\b(?:it|that|this|these|those|them|same|previous|last one|other one)\b")
+
+
+class ModelRouter:
+    """
+    Picks the model for a turn: short, self-contained requests go to the fast model;
+    long, multi-step or history-dependent ones go to the capable model. A fast-model
+    answer whose tool calls cannot be parsed is escalated too. Decisions and per-model
+    latency are kept for /metrics.
+    """
+
+    def __init__(self, fast_model: str, capable_model: Optional[str], max_fast_chars: int):
+        self.fast_model = fast_model
+        self.capable_model = capable_model or None
+        self.max_fast_chars = max_fast_chars
+        self.decisions: Dict[str, int] = {}
+        self.escalations: Dict[str, int] = {}
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.calls: Dict[str, int] = {}
+
+    def choose(self, message: str, has_history: bool = False) -> Tuple[str, str]:
+        """Return (model, reason) for the message"""
+        if not self.capable_model or self.capable_model == self.fast_model:
+            return self.fast_model, "single_model"
+        text = message.strip().lower()
+        if len(text) > self.max_fast_chars:
+            return self.capable_model, "long"
+        if _MULTI_STEP.search(text):
+            return self.capable_model, "multi_step"
+        if has_history and _REFERENCE.search(text):
+            return self.capable_model, "reference"
+        return self.fast_model, "simple"
+
+    def record_decision(self, reason: str):
+        self.decisions[reason] = self.decisions.get(reason, 0) + 1
+
+    def escalation_for(self, model: str) -> Optional[str]:
+        """The model to retry with after `model` produced unusable output, if any"""
+        if self.capable_model and model != self.capable_model:
+            return self.capable_model
+        return None
+
+    def record_escalation(self, reason: str):
+        self.escalations[reason] = self.escalations.get(reason, 0) + 1
+
+    def record_latency(self, model: str, seconds: float):
+        self.calls[model] = self.calls.get(model, 0) + 1
+        self.latencies.setdefault(model, deque(maxlen=1000)).append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        routed = sum(self.decisions.values())
+        escalated = sum(
+            count for reason, count in self.decisions.items() if reason in ("long", "multi_step", "reference")
+        ) + sum(self.escalations.values())
+        models = {}
+        for model, samples in self.latencies.items():
+            ordered = sorted(samples)
+            models[model] = {
+                "calls": self.calls[model],
+                "avg_seconds": sum(ordered) / len(ordered),
+                "p95_seconds": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+            }
+        return {
+            "fast_model": self.fast_model,
+            "capable_model": self.capable_model,
+            "decisions": dict(self.decisions),
+            "escalations": dict(self.escalations),
+            "escalation_rate": escalated / routed if routed else 0.0,
+            "models": models,
+        }
+
+
+def build_model_router() -> ModelRouter:
+    return ModelRouter(settings.groq_model, settings.groq_capable_model, settings.llm_router_max_fast_chars)
@@ -0,0 +1,244 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+from ...config.settings import settings
+from ..rate_limiter import SlidingWindowLimiter
+from ..shared_store import AsyncLocalSharedStore, get_async_shared_store
+
+
+class LLMBusy(Exception):
+    """Raised instead of waiting when an LLM call cannot start before its deadline"""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"LLM capacity exhausted ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("user_id", "tokens", "future", "enqueued_at", "deadline")
+
+    def __init__(self, user_id: str, tokens: int, deadline: float):
+        self.user_id = user_id
+        self.tokens = tokens
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+
+
+def _percentile(samples: Deque[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LLMScheduler:
+    """
+    Dispatch layer in front of the LLM client. At most `max_concurrency` calls run at
+    once; the rest wait in per-user FIFO queues served round-robin, so one chatty user
+    cannot starve the others. Each admitted call is charged its estimated tokens
+    against a tokens-per-minute window (shared across workers when the store is).
+    Calls that cannot start before their deadline fail fast with LLMBusy.
+    Queue wait and model latency are measured separately.
+    """
+
+    def __init__(self, max_concurrency: int, tokens_per_minute: int, max_queue: int,
+                 max_queue_per_user: int, queue_timeout: float, store=None):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+        self.token_window = SlidingWindowLimiter(store or AsyncLocalSharedStore(), 60)
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._queued = 0
+        self._in_flight = 0
+        self._retry_handle: Optional[asyncio.TimerHandle] = None
+        self._dispatching = False
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+        self.wait_seconds: Deque[float] = deque(maxlen=1000)
+        self.model_seconds: Deque[float] = deque(maxlen=1000)
+
+    def _reject(self, reason: str, retry_after: float = 1.0) -> LLMBusy:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return LLMBusy(reason, retry_after)
+
+    async def _charge_tokens(self, tokens: int) -> float:
+        """Spend tokens from the per-minute budget; returns 0 or seconds until they fit"""
+        if self.tokens_per_minute <= 0:
+            return 0.0
+        allowed, retry_after = await self.token_window.hit("llm:tokens", tokens, self.tokens_per_minute)
+        return 0.0 if allowed else max(retry_after, 0.05)
+
+    async def _charge_tokens_holding_slot(self, tokens: int) -> float:
+        """_charge_tokens for a caller that already took a slot; gives it back if the charge fails"""
+        try:
+            return await self._charge_tokens(tokens)
+        except BaseException:
+            # Store error or cancellation: the slot must not leak
+            self._in_flight -= 1
+            self._kick()
+            raise
+
+    def _kick(self):
+        """Start a dispatch pass unless one is running or waiting for the token budget"""
+        if self._queues and not self._dispatching and self._retry_handle is None:
+            self._dispatching = True
+            asyncio.ensure_future(self._dispatch())
+
+    def _retry_dispatch(self):
+        self._retry_handle = None
+        self._kick()
+
+    async def _dispatch(self):
+        """Grant free slots to queued waiters, one user at a time in rotation"""
+        try:
+            while self._in_flight < self.max_concurrency and self._queues:
+                user_id, queue = next(iter(self._queues.items()))
+                waiter = queue[0]
+                if waiter.future.done():
+                    # Timed out or cancelled while queued
+                    self._pop(user_id)
+                    continue
+                # Only this pass pops queues, so the head is still `waiter` afterwards
+                try:
+                    retry_after = await self._charge_tokens(waiter.tokens)
+                except Exception as e:
+                    # The store failed: hand the error to this waiter instead of stranding it
+                    if not waiter.future.done():
+                        waiter.future.set_exception(e)
+                    continue
+                if waiter.future.done():
+                    # Gave up while being charged; the tokens stay spent (errs on the safe side)
+                    continue
+                if retry_after:
+                    # Budget exhausted: fail the waiters that cannot last until it refills
+                    now = time.monotonic()
+                    for queued_user in list(self._queues):
+                        for queued in list(self._queues.get(queued_user, ())):
+                            if queued.deadline < now + retry_after and not queued.future.done():
+                                queued.future.set_exception(self._reject("tokens_per_minute", retry_after))
+                    if self._queues:
+                        loop = asyncio.get_running_loop()
+                        self._retry_handle = loop.call_later(retry_after, self._retry_dispatch)
+                    return
+                self._pop(user_id)
+                self._in_flight += 1
+                waiter.future.set_result(None)
+        finally:
+            self._dispatching = False
+
+    def _pop(self, user_id: str):
+        queue = self._queues.pop(user_id)
+        queue.popleft()
+        self._queued -= 1
+        if queue:
+            # Back of the rotation
+            self._queues[user_id] = queue
+
+    async def acquire(self, user_id: str, tokens: int, timeout: Optional[float] = None) -> float:
+        """Wait for a call slot; returns the seconds spent queued"""
+        timeout = self.queue_timeout if timeout is None else timeout
+        if self._in_flight < self.max_concurrency and not self._queues:
+            # Hold the slot while the budget is checked, so nobody else takes it meanwhile
+            self._in_flight += 1
+            retry_after = await self._charge_tokens_holding_slot(tokens)
+            if not retry_after:
+                self.admitted += 1
+                self.wait_seconds.append(0.0)
+                return 0.0
+            self._in_flight -= 1
+            self._kick()
+            if retry_after > timeout:
+                raise self._reject("tokens_per_minute", retry_after)
+        if self._queued >= self.max_queue:
+            raise self._reject("queue_full")
+        if len(self._queues.get(user_id, ())) >= self.max_queue_per_user:
+            raise self._reject("user_queue_full")
+
+        waiter = _Waiter(user_id, tokens, time.monotonic() + timeout)
+        self._queues.setdefault(user_id, deque()).append(waiter)
+        self._queued += 1
+        self._kick()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                # Still queued: leave it for _dispatch to skip
+                waiter.future.cancel()
+                raise self._reject("deadline")
+            if waiter.future.exception() is not None:
+                raise waiter.future.exception()
+            # Granted just as the deadline passed; keep the slot
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                self.release()
+            else:
+                waiter.future.cancel()
+            raise
+        waited = time.monotonic() - waiter.enqueued_at
+        self.admitted += 1
+        self.wait_seconds.append(waited)
+        return waited
+
+    async def try_acquire(self, tokens: int) -> bool:
+        """
+        Take a slot and charge `tokens` only if both are available right now and nobody
+        is queued (for extra, hedged requests); release() it afterwards
+        """
+        if self._in_flight >= self.max_concurrency or self._queues:
+            return False
+        self._in_flight += 1
+        if await self._charge_tokens_holding_slot(tokens):
+            self._in_flight -= 1
+            self._kick()
+            return False
+        return True
+
+    def release(self):
+        self._in_flight -= 1
+        self._kick()
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, tokens: int, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold a call slot for the duration of the block (the whole stream, when streaming)"""
+        await self.acquire(user_id, tokens, timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.model_seconds.append(time.monotonic() - started)
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "queued_users": len(self._queues),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "tokens_per_minute": self.tokens_per_minute,
+            "avg_wait_seconds": sum(self.wait_seconds) / len(self.wait_seconds) if self.wait_seconds else 0.0,
+            "p95_wait_seconds": _percentile(self.wait_seconds, 0.95),
+            "avg_model_seconds": sum(self.model_seconds) / len(self.model_seconds) if self.model_seconds else 0.0,
+            "p95_model_seconds": _percentile(self.model_seconds, 0.95),
+        }
+
+
+def build_llm_scheduler(backend: str) -> LLMScheduler:
+    """Scheduler whose token window lives in settings.llm_scheduler_backend ("memory" or "shared")"""
+    if backend not in ("memory", "shared"):
+        raise ValueError(f"Unknown LLM scheduler backend: {backend}")
+    return LLMScheduler(
+        settings.llm_max_concurrency,
+        settings.llm_tokens_per_minute,
+        settings.llm_max_queue,
+        settings.llm_max_queue_per_user,
+        settings.llm_queue_timeout_seconds,
+        store=get_async_shared_store() if backend == "shared" else AsyncLocalSharedStore(),
+    )
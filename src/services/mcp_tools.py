@@ -1,14 +1,47 @@
-from typing import Dict, Any, Optional
-from sqlmodel import Session
+from typing import Dict, Any, List, Optional
+from uuid import UUID
+from sqlmodel import Session, select
 from ..models.task import Task, TaskCreate
-from ..services.task_service import create_task, get_tasks, update_task, delete_task, toggle_task_completion
+from ..services.task_service import (
+    create_task, get_tasks, update_task, delete_task, toggle_task_completion,
+    set_tasks_completed_bulk, delete_tasks_bulk
+)
+
+
+class TaskSnapshot:
+    """
+    The user's ordered task list, read at most once per chat turn. Every task number
+    in the turn ("complete 1, 3 and 5") resolves against it, so numbering does not
+    shift after a delete in the same turn and N tool calls cost one query.
+    """
+
+    def __init__(self, session: Session, user_id: str, limit: int = 100):
+        self.session = session
+        self.user_id = user_id
+        self.limit = limit
+        self._tasks: Optional[List[Task]] = None
+        # Set once the turn writes, after which the snapshot no longer reflects the list
+        self.dirty = False
+
+    @property
+    def tasks(self) -> List[Task]:
+        if self._tasks is None:
+            self._tasks = list(get_tasks(self.session, self.user_id, completed=None, offset=0, limit=self.limit))
+        return self._tasks
+
+    def title_of(self, task_id: str) -> Optional[str]:
+        for task in self.tasks:
+            if str(task.id) == task_id:
+                return task.title
+        return None
 
 
 class MCPTools:
     """MCP Server Tools for Task Management"""
     
     @staticmethod
-    def add_task(session: Session, user_id: str, title: str, description: Optional[str] = None) -> Dict[str, Any]:
+    def add_task(session: Session, user_id: str, title: str, description: Optional[str] = None,
+                 snapshot: Optional[TaskSnapshot] = None) -> Dict[str, Any]:
         """Create a new task"""
         try:
             print(f"MCP add_task called with user_id: {user_id}, title: {title}, description: {description}")
@@ -16,6 +49,8 @@ class MCPTools:
             task_description = description if description and description.strip() else None
             task_data = TaskCreate(title=title, description=task_description)
             task = create_task(session, task_data, user_id)
+            if snapshot is not None:
+                snapshot.dirty = True
             return {
                 "task_id": str(task.id),
                 "status": "created",
@@ -27,7 +62,8 @@ class MCPTools:
             return {"error": str(e)}
     
     @staticmethod
-    def list_tasks(session: Session, user_id: str, status: str = "all") -> Dict[str, Any]:
+    def list_tasks(session: Session, user_id: str, status: str = "all",
+                   snapshot: Optional[TaskSnapshot] = None) -> Dict[str, Any]:
         """Retrieve tasks from the list"""
         try:
             print(f"MCP list_tasks called with user_id: {user_id}, status: {status}")
@@ -39,7 +75,10 @@ class MCPTools:
             elif status == "pending":
                 completed_filter = False
             
-            tasks = get_tasks(session, user_id, completed_filter, offset=0, limit=100)
+            if snapshot is not None and not snapshot.dirty and completed_filter is None:
+                tasks = snapshot.tasks
+            else:
+                tasks = get_tasks(session, user_id, completed_filter, offset=0, limit=100)
             print(f"Found {len(tasks)} tasks for user {user_id}")
             
             task_list = []
@@ -65,40 +104,46 @@ class MCPTools:
             return {"error": str(e)}
     
     @staticmethod
-    def _resolve_task_id(session: Session, user_id: str, task_identifier: str) -> Optional[str]:
+    def _resolve_task_id(session: Session, user_id: str, task_identifier: str,
+                         snapshot: Optional[TaskSnapshot] = None) -> Optional[str]:
         """
         Resolve a task identifier (number or UUID) to actual UUID
         If user says 'task 1' or '1', map it to the first task's UUID
         """
         # Check if it's already a valid UUID format
         try:
-            from uuid import UUID
             UUID(task_identifier)
             return task_identifier  # It's already a UUID
-        except (ValueError, AttributeError):
+        except (ValueError, AttributeError, TypeError):
             pass
         
         # Try to parse as task number (1, 2, 3, etc.)
         try:
             task_number = int(task_identifier)
-            # Get user's tasks
-            tasks = get_tasks(session, user_id, completed=None, offset=0, limit=100)
+            # Get user's tasks (from the turn's snapshot when there is one)
+            if snapshot is not None:
+                tasks = snapshot.tasks
+            else:
+                tasks = get_tasks(session, user_id, completed=None, offset=0, limit=100)
             if 1 <= task_number <= len(tasks):
                 # Return the UUID of the nth task (1-indexed)
                 return str(tasks[task_number - 1].id)
             else:
                 return None
-        except (ValueError, IndexError):
+        except (ValueError, IndexError, TypeError):
             return None
     
     @staticmethod
-    def complete_task(session: Session, user_id: str, task_id: str) -> Dict[str, Any]:
+    def complete_task(session: Session, user_id: str, task_id: str,
+                      snapshot: Optional[TaskSnapshot] = None) -> Dict[str, Any]:
         """Mark a task as complete"""
         try:
             # Resolve task number to UUID if needed
-            resolved_id = MCPTools._resolve_task_id(session, user_id, task_id)
+            resolved_id = MCPTools._resolve_task_id(session, user_id, task_id, snapshot)
             if not resolved_id:
                 return {"error": f"Task '{task_id}' not found"}
+            if snapshot is not None:
+                snapshot.dirty = True
             
             from ..models.task import TaskToggleComplete
             toggle_data = TaskToggleComplete(completed=True)
@@ -117,13 +162,16 @@ class MCPTools:
             return {"error": str(e)}
     
     @staticmethod
-    def delete_task(session: Session, user_id: str, task_id: str) -> Dict[str, Any]:
+    def delete_task(session: Session, user_id: str, task_id: str,
+                    snapshot: Optional[TaskSnapshot] = None) -> Dict[str, Any]:
         """Remove a task from the list"""
         try:
             # Resolve task number to UUID if needed
-            resolved_id = MCPTools._resolve_task_id(session, user_id, task_id)
+            resolved_id = MCPTools._resolve_task_id(session, user_id, task_id, snapshot)
             if not resolved_id:
                 return {"error": f"Task '{task_id}' not found"}
+            if snapshot is not None:
+                snapshot.dirty = True
             
             success = delete_task(session, resolved_id, user_id)
             if success:
@@ -139,13 +187,16 @@ class MCPTools:
             return {"error": str(e)}
     
     @staticmethod
-    def update_task(session: Session, user_id: str, task_id: str, title: Optional[str] = None, description: Optional[str] = None) -> Dict[str, Any]:
+    def update_task(session: Session, user_id: str, task_id: str, title: Optional[str] = None, description: Optional[str] = None,
+                    snapshot: Optional[TaskSnapshot] = None) -> Dict[str, Any]:
         """Modify task title or description"""
         try:
             # Resolve task number to UUID if needed
-            resolved_id = MCPTools._resolve_task_id(session, user_id, task_id)
+            resolved_id = MCPTools._resolve_task_id(session, user_id, task_id, snapshot)
             if not resolved_id:
                 return {"error": f"Task '{task_id}' not found"}
+            if snapshot is not None:
+                snapshot.dirty = True
             
             from ..models.task import TaskUpdate
             update_data = TaskUpdate(title=title, description=description)
@@ -163,3 +214,64 @@ class MCPTools:
             import traceback
             traceback.print_exc()
             return {"error": str(e)}
+
+    @staticmethod
+    def _resolve_task_ids(session: Session, user_id: str, task_ids: List[str],
+                          snapshot: TaskSnapshot) -> List[Optional[UUID]]:
+        resolved = []
+        for task_id in task_ids:
+            resolved_id = MCPTools._resolve_task_id(session, user_id, task_id, snapshot)
+            resolved.append(UUID(resolved_id) if resolved_id else None)
+        return resolved
+
+    @staticmethod
+    def complete_tasks(session: Session, user_id: str, task_ids: List[str], snapshot: TaskSnapshot) -> List[Dict[str, Any]]:
+        """complete_task for several identifiers with one UPDATE; one result per identifier"""
+        try:
+            resolved = MCPTools._resolve_task_ids(session, user_id, task_ids, snapshot)
+            found = set_tasks_completed_bulk(session, [task_id for task_id in resolved if task_id], True, user_id)
+            snapshot.dirty = True
+            titles = {str(task.id): task.title for task in snapshot.tasks}
+            # Tasks addressed by UUID may be outside the snapshot
+            missing = [task_id for task_id, ok in found.items() if ok and str(task_id) not in titles]
+            if missing:
+                titles.update(
+                    (str(task_id), title)
+                    for task_id, title in session.exec(select(Task.id, Task.title).where(Task.id.in_(missing)))
+                )
+            results = []
+            for task_id, resolved_id in zip(task_ids, resolved):
+                if resolved_id is None:
+                    results.append({"error": f"Task '{task_id}' not found"})
+                elif not found.get(resolved_id):
+                    results.append({"error": "Task not found"})
+                else:
+                    results.append({
+                        "task_id": resolved_id,
+                        "status": "completed",
+                        "title": titles.get(str(resolved_id), "")
+                    })
+            return results
+        except Exception as e:
+            print(f"Error in complete_tasks: {str(e)}")
+            return [{"error": str(e)} for _ in task_ids]
+
+    @staticmethod
+    def delete_tasks(session: Session, user_id: str, task_ids: List[str], snapshot: TaskSnapshot) -> List[Dict[str, Any]]:
+        """delete_task for several identifiers with one DELETE; one result per identifier"""
+        try:
+            resolved = MCPTools._resolve_task_ids(session, user_id, task_ids, snapshot)
+            found = delete_tasks_bulk(session, [task_id for task_id in resolved if task_id], user_id)
+            snapshot.dirty = True
+            results = []
+            for task_id, resolved_id in zip(task_ids, resolved):
+                if resolved_id is None:
+                    results.append({"error": f"Task '{task_id}' not found"})
+                elif not found.get(resolved_id):
+                    results.append({"error": "Task not found"})
+                else:
+                    results.append({"task_id": str(resolved_id), "status": "deleted"})
+            return results
+        except Exception as e:
+            print(f"Error in delete_tasks: {str(e)}")
+            return [{"error": str(e)} for _ in task_ids]
@@ -0,0 +1,88 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+from ..config.settings import settings
+
+
+class PasswordHasherBusy(Exception):
+    """Raised instead of queueing when the bcrypt pool's queue is full, or when it lost a worker"""
+
+
+class PasswordHasherPool:
+    """
+    Runs bcrypt work in a dedicated process pool so password checks use other cores
+    instead of the request worker. At most `max_pending` calls are admitted at once
+    (running plus queued); beyond that callers get PasswordHasherBusy immediately.
+    A pool that lost a worker (OOM kill, crash) is replaced on the next call.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_queue: int = 32):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = self.workers + max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.restarts = 0
+        self.total_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Not fork: forking a process that already runs an event loop and threads is unsafe
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context(start_method)
+            )
+        return self._executor
+
+    async def run(self, func: Callable, *args) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy("Password hashing capacity exhausted")
+        self.pending += 1
+        started = time.perf_counter()
+        executor = self._get_executor()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            self.failed += 1
+            # A broken pool fails every later call too; drop it so the next call starts a fresh one
+            if self._executor is executor:
+                print("Password hasher pool lost a worker, restarting it")
+                self.restarts += 1
+                self.shutdown()
+            raise PasswordHasherBusy("Password hashing pool restarting")
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.total_seconds += time.perf_counter() - started
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "in_flight": min(self.pending, self.workers),
+            "queue_depth": max(self.pending - self.workers, 0),
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "restarts": self.restarts,
+            "avg_seconds": self.total_seconds / self.completed if self.completed else 0.0,
+        }
+
+
+password_hasher = PasswordHasherPool(settings.bcrypt_pool_workers, settings.bcrypt_pool_max_queue)
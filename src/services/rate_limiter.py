@@ -0,0 +1,52 @@
+import time
+from typing import Any, Dict, Tuple
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding-window counter over an async shared store (redis.asyncio API). Each key
+    keeps one counter per fixed window; the previous window's count is weighted by
+    how much of it still overlaps the sliding window. Counters are only touched with
+    incrby/expire, so the same code works against Redis across workers.
+    """
+
+    def __init__(self, store, window_seconds: int):
+        self.store = store
+        self.window = window_seconds
+        self.allowed = 0
+        self.rejected = 0
+
+    def _counter_key(self, key: str, window_index: int) -> str:
+        return f"ratelimit:{key}:{window_index}"
+
+    async def hit(self, key: str, cost: int, budget: int) -> Tuple[bool, float]:
+        """Spend `cost` from `key`'s budget; returns (allowed, seconds until it would fit)"""
+        now = time.time()
+        window_index = int(now // self.window)
+        elapsed = now - window_index * self.window
+        current_key = self._counter_key(key, window_index)
+
+        current = await self.store.incrby(current_key, cost)
+        if current == cost:
+            # First hit in this window; keep it long enough to serve as the next "previous"
+            await self.store.expire(current_key, self.window * 2)
+        previous = int(await self.store.get(self._counter_key(key, window_index - 1)) or 0)
+        overlap = 1 - elapsed / self.window
+        used = previous * overlap + current
+        if used <= budget:
+            self.allowed += 1
+            return True, 0.0
+
+        # Refund so rejected requests do not keep a client locked out
+        await self.store.incrby(current_key, -cost)
+        self.rejected += 1
+        excess = used - budget
+        if previous and excess <= previous * overlap:
+            # Enough of the previous window slides out before this one ends
+            retry_after = excess * self.window / previous
+        else:
+            retry_after = self.window - elapsed
+        return False, retry_after
+
+    def stats(self) -> Dict[str, Any]:
+        return {"allowed": self.allowed, "rejected": self.rejected, "window_seconds": self.window}
@@ -0,0 +1,139 @@
+import re
+from typing import Iterable, List, Optional
+from uuid import UUID
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.sqltypes import GUID
+from sqlalchemy import Column, MetaData, String, Table, delete, func, insert, inspect, literal_column, or_, text
+from sqlalchemy.engine import Engine
+from ..models.task import Task
+
+# PostgreSQL: GIN expression index, kept current by Postgres itself. The search query
+# must repeat this expression verbatim for the planner to use the index.
+_PG_VECTOR_SQL = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))"
+_PG_INDEX_DDL = f"CREATE INDEX IF NOT EXISTS ix_tasks_search ON tasks USING gin ({_PG_VECTOR_SQL})"
+
+# SQLite: FTS5 table maintained by the task_service write functions
+_SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "task_id UNINDEXED, user_id UNINDEXED, title, description)"
+)
+tasks_fts = Table(
+    "tasks_fts",
+    MetaData(),
+    Column("task_id", GUID()),
+    Column("user_id", GUID()),
+    Column("title", String),
+    Column("description", String),
+)
+
+
+def ensure_search_index(engine: Engine):
+    """Create the dialect's full-text index, backfilling the SQLite FTS table on first creation"""
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(_PG_INDEX_DDL))
+        elif engine.dialect.name == "sqlite":
+            created = not inspect(conn).has_table("tasks_fts")
+            conn.execute(text(_SQLITE_FTS_DDL))
+            if created:
+                conn.execute(insert(tasks_fts).from_select(
+                    ["task_id", "user_id", "title", "description"],
+                    select(Task.id, Task.user_id, Task.title, Task.description)
+                ))
+
+
+def _uses_fts_table(session: Session) -> bool:
+    return session.get_bind().dialect.name == "sqlite"
+
+
+def index_tasks(session: Session, tasks: Iterable):
+    """Add tasks (Task objects or column dicts) to the search index"""
+    if not _uses_fts_table(session):
+        return
+    rows = [
+        {
+            "task_id": _field(task, "id"),
+            "user_id": _field(task, "user_id"),
+            "title": _field(task, "title"),
+            "description": _field(task, "description"),
+        }
+        for task in tasks
+    ]
+    if rows:
+        session.exec(insert(tasks_fts), params=rows)
+
+
+def unindex_tasks(session: Session, task_ids: Iterable[UUID]):
+    """Remove tasks from the search index"""
+    if not _uses_fts_table(session):
+        return
+    task_ids = list(task_ids)
+    if task_ids:
+        session.exec(delete(tasks_fts).where(tasks_fts.c.task_id.in_(task_ids)))
+
+
+def reindex_task(session: Session, task: Task):
+    """Refresh an edited task's indexed text"""
+    if not _uses_fts_table(session):
+        return
+    unindex_tasks(session, [task.id])
+    index_tasks(session, [task])
+
+
+def _field(task, name: str):
+    return task[name] if isinstance(task, dict) else getattr(task, name)
+
+
+def _fts5_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix"""
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_tasks(session: Session, user_id: str, query: str, completed: Optional[bool] = None,
+                 offset: int = 0, limit: int = 50) -> List[Task]:
+    """Return the user's tasks matching `query`, best match first"""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        vector = literal_column(_PG_VECTOR_SQL)
+        tsquery = func.websearch_to_tsquery(literal_column("'english'"), query)
+        statement = (
+            select(Task)
+            .where(Task.user_id == user_id, vector.op("@@")(tsquery))
+            .order_by(func.ts_rank(vector, tsquery).desc(), Task.created_at, Task.id)
+        )
+    elif dialect == "sqlite":
+        fts_query = _fts5_query(query)
+        if fts_query is None:
+            return []
+        statement = (
+            select(Task)
+            .join(tasks_fts, tasks_fts.c.task_id == Task.id)
+            .where(
+                text("tasks_fts MATCH :fts_query").bindparams(fts_query=fts_query),
+                tasks_fts.c.user_id == user_id,
+                Task.user_id == user_id,
+            )
+            .order_by(literal_column("bm25(tasks_fts)"), Task.created_at, Task.id)
+        )
+    else:
+        pattern = f"%{query}%"
+        statement = (
+            select(Task)
+            .where(Task.user_id == user_id, or_(Task.title.ilike(pattern), Task.description.ilike(pattern)))
+            .order_by(Task.created_at, Task.id)
+        )
+    if completed is not None:
+        statement = statement.where(Task.completed == completed)
+    statement = statement.offset(offset).limit(limit)
+    return session.exec(statement).all()
+
+
+async def search_tasks_async(session: AsyncSession, user_id: str, query: str, completed: Optional[bool] = None,
+                             offset: int = 0, limit: int = 50) -> List[Task]:
+    return await session.run_sync(search_tasks, user_id, query, completed, offset, limit)
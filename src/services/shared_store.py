@@ -0,0 +1,173 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from ..config.settings import settings
+
+
+def _check_int(name: str, value):
+    """Reject what redis-py and Redis would: expiries and increments must be ints, not floats"""
+    if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+        raise TypeError(f"{name} must be an int, got {type(value).__name__}")
+
+
+class LocalSharedStore:
+    """
+    In-process stand-in for the subset of the redis-py client API that our shared
+    backends use (get/set/delete/incrby/expire/ttl). Lets the shared cache and
+    rate-limit backends run and be exercised without a Redis server; in production
+    point settings.shared_store_url at Redis so state is shared across workers.
+    Expired keys are dropped when read and by a sweep every `sweep_interval`
+    seconds, so keys that are never read again do not accumulate.
+    """
+
+    def __init__(self, sweep_interval: float = 60):
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _maybe_sweep(self, now: float):
+        """Drop every expired key, at most once per sweep_interval (caller holds the lock)"""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        expired = [key for key, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self._data[key]
+
+    def _live(self, key: str, now: float):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._live(key, time.monotonic())
+            return item[0] if item else None
+
+    def set(self, key: str, value, ex: Optional[int] = None, nx: bool = False) -> bool:
+        _check_int("ex", ex)
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_sweep(now)
+            if nx and self._live(key, now):
+                return False
+            self._data[key] = (value, now + ex if ex else None)
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def incrby(self, key: str, amount: int = 1) -> int:
+        _check_int("amount", amount)
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_sweep(now)
+            item = self._live(key, now)
+            value, expires_at = item if item else (0, None)
+            value = int(value) + amount
+            self._data[key] = (value, expires_at)
+            return value
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        return self.incrby(key, amount)
+
+    def expire(self, key: str, seconds: int) -> bool:
+        _check_int("seconds", seconds)
+        with self._lock:
+            item = self._live(key, time.monotonic())
+            if not item:
+                return False
+            self._data[key] = (item[0], time.monotonic() + seconds)
+            return True
+
+    def ttl(self, key: str) -> float:
+        """Seconds until `key` expires; -1 without expiry, -2 when missing (as in Redis)"""
+        with self._lock:
+            now = time.monotonic()
+            item = self._live(key, now)
+            if not item:
+                return -2
+            return -1 if item[1] is None else item[1] - now
+
+    def flushall(self):
+        with self._lock:
+            self._data.clear()
+
+
+class AsyncLocalSharedStore:
+    """Awaitable view of a LocalSharedStore with the redis.asyncio method signatures"""
+
+    def __init__(self, store: Optional[LocalSharedStore] = None):
+        self.store = store if store is not None else LocalSharedStore()
+
+    async def get(self, key: str):
+        return self.store.get(key)
+
+    async def set(self, key: str, value, ex: Optional[int] = None, nx: bool = False) -> bool:
+        return self.store.set(key, value, ex=ex, nx=nx)
+
+    async def delete(self, *keys: str) -> int:
+        return self.store.delete(*keys)
+
+    async def incrby(self, key: str, amount: int = 1) -> int:
+        return self.store.incrby(key, amount)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return self.store.incrby(key, amount)
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        return self.store.expire(key, seconds)
+
+    async def ttl(self, key: str) -> float:
+        return self.store.ttl(key)
+
+    async def flushall(self):
+        self.store.flushall()
+
+
+_shared_store = None
+_async_shared_store = None
+
+
+def get_shared_store():
+    """Return the process-wide shared store client (Redis when configured)"""
+    global _shared_store
+    if _shared_store is None:
+        if settings.shared_store_url:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("settings.shared_store_url requires the 'redis' package") from e
+            _shared_store = redis.Redis.from_url(settings.shared_store_url)
+        else:
+            _shared_store = LocalSharedStore()
+    return _shared_store
+
+
+def get_async_shared_store():
+    """
+    Async client for the same shared store, for code running on the event loop
+    (redis.asyncio when configured, so Redis round trips never block the loop)
+    """
+    global _async_shared_store
+    if _async_shared_store is None:
+        if settings.shared_store_url:
+            try:
+                import redis.asyncio as aioredis
+            except ImportError as e:
+                raise RuntimeError("settings.shared_store_url requires the 'redis' package") from e
+            _async_shared_store = aioredis.Redis.from_url(settings.shared_store_url)
+        else:
+            # Same data as the sync store, so both views agree within a process
+            _async_shared_store = AsyncLocalSharedStore(get_shared_store())
+    return _async_shared_store
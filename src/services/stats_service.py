@@ -0,0 +1,135 @@
+import argparse
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import case, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from ..models.task import Task, TaskStats, get_pakistan_time
+
+
+def _count_tasks(session: Session, user_id: Optional[str] = None) -> Dict[UUID, Tuple[int, int]]:
+    """Count (total, completed) straight from the tasks table, per user"""
+    statement = select(
+        Task.user_id,
+        func.count(Task.id),
+        func.coalesce(func.sum(case((Task.completed, 1), else_=0)), 0),
+    ).group_by(Task.user_id)
+    if user_id is not None:
+        statement = statement.where(Task.user_id == user_id)
+    return {row[0]: (row[1], row[2]) for row in session.exec(statement)}
+
+
+def _insert_stats(session: Session, user_id: str, total: int, completed: int, total_delta: int, completed_delta: int):
+    """
+    Insert a counters row; if a concurrent transaction created it first, apply our
+    delta to theirs instead (their counts could not see our uncommitted change).
+    """
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(TaskStats).values(
+        user_id=user_id, total=total, completed=completed, version=1, updated_at=get_pakistan_time()
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[TaskStats.user_id],
+        set_={
+            "total": TaskStats.total + total_delta,
+            "completed": TaskStats.completed + completed_delta,
+            "version": TaskStats.version + 1,
+            "updated_at": statement.excluded.updated_at,
+        },
+    )
+    session.exec(statement)
+
+
+def bump_task_stats(session: Session, user_id: str, total_delta: int = 0, completed_delta: int = 0):
+    """
+    Apply a task write to the user's counters inside the caller's transaction.
+    Called after the write is flushed, so a missing row is initialised from the
+    tasks table (which already includes this write).
+    """
+    statement = (
+        update(TaskStats)
+        .where(TaskStats.user_id == user_id)
+        .values(
+            total=TaskStats.total + total_delta,
+            completed=TaskStats.completed + completed_delta,
+            version=TaskStats.version + 1,
+            updated_at=get_pakistan_time(),
+        )
+    )
+    if session.exec(statement).rowcount:
+        return
+    total, completed = _count_tasks(session, user_id).get(UUID(str(user_id)), (0, 0))
+    _insert_stats(session, user_id, total, completed, total_delta, completed_delta)
+
+
+def get_task_stats(session: Session, user_id: str) -> TaskStats:
+    """Return the user's counters, creating the row from the tasks table on first use"""
+    stats = session.get(TaskStats, UUID(str(user_id)))
+    if stats is None:
+        bump_task_stats(session, user_id)
+        stats = session.get(TaskStats, UUID(str(user_id)))
+    return stats
+
+
+async def get_task_stats_async(session: AsyncSession, user_id: str) -> TaskStats:
+    return await session.run_sync(get_task_stats, user_id)
+
+
+def verify_task_stats(session: Session, user_id: Optional[str] = None, repair: bool = False) -> List[Dict]:
+    """
+    Compare the counters with the tasks table and list every user whose counters
+    drifted. With repair=True the drifted rows are rewritten (and their version
+    bumped, so ETags issued from the bad counters stop matching).
+    """
+    actual = _count_tasks(session, user_id)
+    statement = select(TaskStats)
+    if user_id is not None:
+        statement = statement.where(TaskStats.user_id == user_id)
+    stored = {stats.user_id: stats for stats in session.exec(statement)}
+
+    drift = []
+    for uid in set(actual) | set(stored):
+        expected_total, expected_completed = actual.get(uid, (0, 0))
+        stats = stored.get(uid)
+        if stats is not None and (stats.total, stats.completed) == (expected_total, expected_completed):
+            continue
+        drift.append({
+            "user_id": str(uid),
+            "stored": None if stats is None else {"total": stats.total, "completed": stats.completed},
+            "actual": {"total": expected_total, "completed": expected_completed},
+        })
+        if repair:
+            if stats is None:
+                stats = TaskStats(user_id=uid)
+            stats.total = expected_total
+            stats.completed = expected_completed
+            stats.version += 1
+            stats.updated_at = get_pakistan_time()
+            session.add(stats)
+    if repair:
+        session.commit()
+    return drift
+
+
+def main():
+    """Verify or rebuild the task_stats counters: python -m src.services.stats_service verify|rebuild"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--user-id", help="Only check this user")
+    args = parser.parse_args()
+
+    from ..database import engine
+    with Session(engine) as session:
+        drift = verify_task_stats(session, args.user_id, repair=args.command == "rebuild")
+    for entry in drift:
+        print(f"{entry['user_id']}: stored={entry['stored']} actual={entry['actual']}")
+    action = "repaired" if args.command == "rebuild" else "found"
+    print(f"{len(drift)} drifted user(s) {action}")
+    if args.command == "verify" and drift:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from uuid import UUID
+from ..config.settings import settings
+from .shared_store import get_async_shared_store
+
+# A cached page is a tuple of plain column dicts; callers get fresh Task objects built from them
+CachedRows = Tuple[Dict[str, Any], ...]
+
+
+class MemoryTaskCacheBackend:
+    """Per-process LRU cache with a TTL, an entry cap and an approximate memory cap"""
+
+    # No I/O, so it is called directly from both the sync and the async path
+    is_async = False
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, int, CachedRows]]" = OrderedDict()
+        self._user_keys: Dict[str, set] = {}
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def generation(self, user_id: str) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def get(self, user_id: str, key: Hashable) -> Optional[CachedRows]:
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None:
+                return None
+            expires_at, _, rows = entry
+            if expires_at <= time.monotonic():
+                self._remove((user_id, key))
+                return None
+            self._entries.move_to_end((user_id, key))
+            return rows
+
+    def set(self, user_id: str, key: Hashable, rows: CachedRows, generation: int):
+        size = estimate_size(rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # An invalidation happened while the rows were loading, so they may be stale
+            if self._generations.get(user_id, 0) != generation:
+                return
+            self._remove((user_id, key))
+            self._entries[(user_id, key)] = (time.monotonic() + self.ttl_seconds, size, rows)
+            self._user_keys.setdefault(user_id, set()).add(key)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in list(self._user_keys.get(user_id, ())):
+                self._remove((user_id, key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self._generations.clear()
+            self._bytes = 0
+
+    def _remove(self, entry_key: Tuple[str, Hashable]):
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[1]
+        user_id, key = entry_key
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "bytes": self._bytes, "evictions": self.evictions}
+
+
+class SharedTaskCacheBackend:
+    """
+    Cache stored in a shared redis-compatible store (redis.asyncio API) so every
+    worker sees the same entries. Entries are keyed by the user's task version,
+    which every committed write bumps, so writes need no invalidation round trip:
+    outdated entries are never read again and age out via the TTL, while eviction
+    under memory pressure is left to the store (e.g. Redis maxmemory-policy allkeys-lru).
+    """
+
+    # Awaited on the async path only; the sync path skips it rather than block the loop
+    is_async = True
+
+    def __init__(self, client, ttl_seconds: float, max_bytes: int, prefix: str = "taskcache"):
+        self.client = client
+        # Redis takes whole seconds for `ex`
+        self.ttl_seconds = max(1, math.ceil(ttl_seconds))
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+
+    def _entry_key(self, user_id: str, key: Hashable) -> str:
+        return f"{self.prefix}:{user_id}:{json.dumps(key, default=str)}"
+
+    async def get(self, user_id: str, key: Hashable) -> Optional[CachedRows]:
+        raw = await self.client.get(self._entry_key(user_id, key))
+        if raw is None:
+            return None
+        return tuple(_decode_row(row) for row in json.loads(raw))
+
+    async def set(self, user_id: str, key: Hashable, rows: CachedRows):
+        raw = json.dumps([_encode_row(row) for row in rows])
+        if len(raw) > self.max_bytes:
+            return
+        await self.client.set(self._entry_key(user_id, key), raw, ex=self.ttl_seconds)
+
+    def invalidate(self, user_id: str):
+        # The write bumped the task version, which is part of every entry key
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+_DATETIME_FIELDS = ("created_at", "updated_at")
+_UUID_FIELDS = ("id", "user_id")
+
+
+def _encode_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    encoded = dict(row)
+    for field in _DATETIME_FIELDS:
+        encoded[field] = row[field].isoformat()
+    for field in _UUID_FIELDS:
+        encoded[field] = str(row[field])
+    return encoded
+
+
+def _decode_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    for field in _DATETIME_FIELDS:
+        row[field] = datetime.fromisoformat(row[field])
+    for field in _UUID_FIELDS:
+        row[field] = UUID(row[field])
+    return row
+
+
+def estimate_size(rows: CachedRows) -> int:
+    """Rough in-memory footprint of cached rows, dominated by the text columns"""
+    return sum(400 + len(row.get("title") or "") + len(row.get("description") or "") for row in rows)
+
+
+class TaskCache:
+    """Read-through cache for task list pages, keyed by user_id and the list filter"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def get_or_load(self, user_id: str, key: Hashable, loader: Callable[[], List[Dict[str, Any]]]) -> CachedRows:
+        if self.backend.is_async:
+            # A shared store round trip here would block the event loop (sync callers run on it)
+            self.bypasses += 1
+            return tuple(loader())
+        generation = self.backend.generation(user_id)
+        rows = self.backend.get(user_id, key)
+        if rows is not None:
+            self.hits += 1
+            return rows
+        self.misses += 1
+        rows = tuple(loader())
+        self.backend.set(user_id, key, rows, generation)
+        return rows
+
+    async def get_or_load_async(self, user_id: str, key: Hashable,
+                                loader: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> CachedRows:
+        if not self.backend.is_async:
+            generation = self.backend.generation(user_id)
+            rows = self.backend.get(user_id, key)
+        else:
+            rows = await self.backend.get(user_id, key)
+        if rows is not None:
+            self.hits += 1
+            return rows
+        self.misses += 1
+        rows = tuple(await loader())
+        if not self.backend.is_async:
+            self.backend.set(user_id, key, rows, generation)
+        else:
+            await self.backend.set(user_id, key, rows)
+        return rows
+
+    def invalidate(self, user_id: str):
+        if self.backend is not None:
+            self.invalidations += 1
+            self.backend.invalidate(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            **(self.backend.stats() if self.backend is not None else {}),
+        }
+
+
+def build_task_cache_backend(backend: str):
+    """Create the backend named by settings.task_cache_backend ("memory", "shared" or "none")"""
+    if backend == "memory":
+        return MemoryTaskCacheBackend(
+            settings.task_cache_ttl_seconds, settings.task_cache_max_entries, settings.task_cache_max_bytes
+        )
+    if backend == "shared":
+        return SharedTaskCacheBackend(
+            get_async_shared_store(), settings.task_cache_ttl_seconds, settings.task_cache_max_bytes
+        )
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown task cache backend: {backend}")
+
+
+task_cache = TaskCache(build_task_cache_backend(settings.task_cache_backend))
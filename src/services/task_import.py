@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from ..config.settings import settings
+from ..models.task import TaskCreate
+from .task_service import import_tasks_async
+
+# (line number, parsed row or None, error message or None)
+ParsedLine = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+class ImportAborted(Exception):
+    """Raised by the parsers when the upload cannot be read any further"""
+
+    def __init__(self, line: int, reason: str):
+        super().__init__(reason)
+        self.line = line
+        self.reason = reason
+
+
+def _parse_ndjson(stream: io.TextIOBase, max_line_length: int) -> Iterator[ParsedLine]:
+    line_no = 0
+    while True:
+        line = stream.readline(max_line_length + 1)
+        if not line:
+            return
+        line_no += 1
+        if len(line) > max_line_length and not line.endswith("\n"):
+            # Skip the remainder of the oversized line without holding it in memory
+            while line and not line.endswith("\n"):
+                line = stream.readline(max_line_length)
+            yield line_no, None, f"Line longer than {max_line_length} characters"
+            continue
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, data, None
+
+
+def _parse_csv(stream: io.TextIOBase, max_line_length: int) -> Iterator[ParsedLine]:
+    reader = csv.DictReader(stream)
+    try:
+        for row in reader:
+            if None in row:
+                yield reader.line_num, None, "More values than header columns"
+                continue
+            # Oversized fields are bounded by csv.field_size_limit while reading
+            if sum(len(value or "") for value in row.values()) > max_line_length:
+                yield reader.line_num, None, f"Row longer than {max_line_length} characters"
+                continue
+            # Empty CSV cells mean "not set"
+            yield reader.line_num, {key: value for key, value in row.items() if value != ""}, None
+    except csv.Error as e:
+        raise ImportAborted(reader.line_num, f"Unreadable CSV: {e}")
+
+
+PARSERS = {"ndjson": _parse_ndjson, "csv": _parse_csv}
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    """Pick the upload format from its file name or content type; NDJSON by default"""
+    if (filename or "").lower().endswith(".csv") or (content_type or "").startswith("text/csv"):
+        return "csv"
+    return "ndjson"
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" if detail["loc"] else detail["msg"]
+        for detail in error.errors()
+    )
+
+
+async def import_tasks_from_upload(session: AsyncSession, upload: BinaryIO, import_format: str,
+                                   user_id: str) -> Dict[str, Any]:
+    """
+    Parse `upload` as a stream and insert its tasks chunk by chunk, committing each chunk.
+    Stops early once settings.task_import_max_rows or task_import_max_errors is exceeded;
+    rows from chunks committed before that point stay imported.
+    """
+    chunk_size = settings.task_import_chunk_size
+    stream = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    lines = PARSERS[import_format](stream, settings.task_import_max_line_length)
+    imported = 0
+    rows_seen = 0
+    errors: List[Dict[str, Any]] = []
+    aborted: Optional[str] = None
+
+    try:
+        while aborted is None:
+            # Parsing reads the spooled upload from disk, so keep it off the event loop
+            try:
+                chunk: List[ParsedLine] = await run_in_threadpool(lambda: list(islice(lines, chunk_size)))
+            except ImportAborted as e:
+                errors.append({"line": e.line, "error": e.reason})
+                aborted = e.reason
+                break
+            except UnicodeDecodeError:
+                aborted = "Upload is not valid UTF-8"
+                break
+            if not chunk:
+                break
+
+            valid: List[TaskCreate] = []
+            for line_no, data, error in chunk:
+                rows_seen += 1
+                if rows_seen > settings.task_import_max_rows:
+                    aborted = f"More than {settings.task_import_max_rows} rows"
+                    break
+                if error is None:
+                    try:
+                        valid.append(TaskCreate.model_validate(data))
+                    except ValidationError as e:
+                        error = _validation_message(e)
+                if error is not None:
+                    errors.append({"line": line_no, "error": error})
+                    if len(errors) > settings.task_import_max_errors:
+                        aborted = f"More than {settings.task_import_max_errors} invalid rows"
+                        break
+
+            if aborted is None and valid:
+                await import_tasks_async(session, valid, user_id)
+                await session.commit()
+                imported += len(valid)
+    finally:
+        # Let the UploadFile close the underlying file itself
+        stream.detach()
+
+    return {"imported": imported, "errors": errors, "aborted": aborted}
@@ -1,24 +1,99 @@
 from sqlmodel import Session, select
-from typing import List, Optional
-from ..models.task import Task, TaskCreate, TaskUpdate, TaskToggleComplete, get_pakistan_time
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import tuple_, insert, update, delete, func
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+from uuid import UUID, uuid4
+from ..models.task import Task, TaskCreate, TaskUpdate, TaskToggleComplete, TaskStats, get_pakistan_time
 from ..models.user import User
-from datetime import datetime
+from .pagination import decode_cursor
+from .task_cache import task_cache
+from .search_service import index_tasks, unindex_tasks, reindex_task
+from .stats_service import bump_task_stats
+from datetime import datetime, timedelta
+
+_TASK_COLUMNS = [column.name for column in Task.__table__.columns]
+
+
+def _pending_task_writes(session: Session) -> set:
+    """User ids with task writes in this session's open transaction"""
+    return session.info.setdefault("task_cache_dirty_users", set())
+
+
+def _tasks_changed(session: Session, user_id: str):
+    """Invalidate cached task lists for `user_id` after a write in `session`"""
+    user_id = str(user_id)
+    task_cache.invalidate(user_id)
+    # Invalidate again once the transaction ends: another session may have cached
+    # the pre-commit rows in the meantime
+    _pending_task_writes(session).add(user_id)
+
+
+@event.listens_for(OrmSession, "after_commit")
+@event.listens_for(OrmSession, "after_rollback")
+def _invalidate_after_transaction(session):
+    dirty_users = session.info.pop("task_cache_dirty_users", None)
+    for user_id in dirty_users or ():
+        task_cache.invalidate(user_id)
 
 
 def create_task(session: Session, task_create: TaskCreate, user_id: str) -> Task:
     db_task = Task(**task_create.dict(), user_id=user_id)
     session.add(db_task)
     session.flush()  # Flush to get the ID without committing
+    index_tasks(session, [db_task])
+    bump_task_stats(session, user_id, 1, int(db_task.completed))
+    _tasks_changed(session, user_id)
     return db_task
 
 
-def get_tasks(session: Session, user_id: str, completed: Optional[bool] = None, 
-              offset: int = 0, limit: int = 50) -> List[Task]:
+def _tasks_page_statement(user_id: str, completed: Optional[bool], offset: int, limit: int, cursor: Optional[str]):
     statement = select(Task).where(Task.user_id == user_id)
     if completed is not None:
         statement = statement.where(Task.completed == completed)
-    statement = statement.offset(offset).limit(limit)
-    return session.exec(statement).all()
+    if cursor:
+        created_at, task_id = decode_cursor(cursor)
+        statement = statement.where(tuple_(Task.created_at, Task.id) > tuple_(created_at, task_id))
+    else:
+        statement = statement.offset(offset)
+    return statement.order_by(Task.created_at, Task.id).limit(limit)
+
+
+def _tasks_page_key(version: str, completed: Optional[bool], offset: int, limit: int, cursor: Optional[str]):
+    return (version, completed, None if cursor else offset, limit, cursor)
+
+
+def _load_task_rows(session: Session, statement) -> List[Dict[str, Any]]:
+    return [{column: getattr(task, column) for column in _TASK_COLUMNS} for task in session.exec(statement)]
+
+
+def get_tasks(session: Session, user_id: str, completed: Optional[bool] = None, 
+              offset: int = 0, limit: int = 50, cursor: Optional[str] = None,
+              version: Optional[str] = None) -> List[Task]:
+    """
+    List a user's tasks ordered by (created_at, id).
+    When `cursor` is given the page starts after that position (keyset pagination)
+    and `offset` is ignored; otherwise the legacy offset paging is used.
+    Pages are served from task_cache unless this session has uncommitted task writes.
+    Cached pages are keyed by the user's task version (pass it if already read), so a
+    write another worker's cache never heard about still misses.
+    """
+    statement = _tasks_page_statement(user_id, completed, offset, limit, cursor)
+
+    user_id = str(user_id)
+    if not task_cache.enabled:
+        return session.exec(statement).all()
+    if user_id in _pending_task_writes(session):
+        # Our own uncommitted writes must neither be hidden nor leak into the cache
+        task_cache.bypasses += 1
+        return session.exec(statement).all()
+
+    if version is None:
+        version = get_tasks_version(session, user_id)
+    key = _tasks_page_key(version, completed, offset, limit, cursor)
+    rows = task_cache.get_or_load(user_id, key, lambda: _load_task_rows(session, statement))
+    return [Task(**row) for row in rows]
 
 
 def get_task(session: Session, task_id: str, user_id: str) -> Optional[Task]:
@@ -26,11 +101,32 @@ def get_task(session: Session, task_id: str, user_id: str) -> Optional[Task]:
     return session.exec(statement).first()
 
 
+def get_tasks_version(session: Session, user_id: str) -> str:
+    """
+    Cheap marker that changes whenever any of the user's tasks is created, updated or deleted:
+    the task_stats version, which every write path bumps (one primary-key lookup).
+    Users without a counters row yet fall back to an index-only (count, max(updated_at)).
+    """
+    stats = session.get(TaskStats, UUID(str(user_id)))
+    if stats is not None:
+        return f"v{stats.version}"
+    statement = select(func.count(Task.id), func.max(Task.updated_at)).where(Task.user_id == user_id)
+    count, last_updated = session.exec(statement).one()
+    return f"a{count}:{last_updated.isoformat() if last_updated else ''}"
+
+
+def get_task_version(session: Session, task_id: str, user_id: str) -> Optional[datetime]:
+    """Return only the task's updated_at, or None when the task does not exist"""
+    statement = select(Task.updated_at).where(Task.id == task_id, Task.user_id == user_id)
+    return session.exec(statement).first()
+
+
 def update_task(session: Session, task_id: str, task_update: TaskUpdate, user_id: str) -> Optional[Task]:
     db_task = get_task(session, task_id, user_id)
     if not db_task:
         return None
         
+    was_completed = db_task.completed
     task_data = task_update.dict(exclude_unset=True)
     for key, value in task_data.items():
         setattr(db_task, key, value)
@@ -38,6 +134,10 @@ def update_task(session: Session, task_id: str, task_update: TaskUpdate, user_id
     db_task.updated_at = get_pakistan_time()
     session.add(db_task)
     session.flush()
+    if "title" in task_data or "description" in task_data:
+        reindex_task(session, db_task)
+    bump_task_stats(session, user_id, 0, int(db_task.completed) - int(was_completed))
+    _tasks_changed(session, user_id)
     return db_task
 
 
@@ -48,6 +148,9 @@ def delete_task(session: Session, task_id: str, user_id: str) -> bool:
         
     session.delete(db_task)
     session.flush()
+    unindex_tasks(session, [db_task.id])
+    bump_task_stats(session, user_id, -1, -int(db_task.completed))
+    _tasks_changed(session, user_id)
     return True
 
 
@@ -56,8 +159,193 @@ def toggle_task_completion(session: Session, task_id: str, toggle_request: TaskT
     if not db_task:
         return None
         
+    was_completed = db_task.completed
     db_task.completed = toggle_request.completed
     db_task.updated_at = get_pakistan_time()
     session.add(db_task)
     session.flush()
-    return db_task
\ No newline at end of file
+    bump_task_stats(session, user_id, 0, int(db_task.completed) - int(was_completed))
+    _tasks_changed(session, user_id)
+    return db_task
+
+
+def _new_task_rows(task_creates: Sequence[TaskCreate], user_id: str) -> List[Dict[str, Any]]:
+    """Build full column dicts for tasks about to be bulk-inserted"""
+    now = get_pakistan_time()
+    rows = []
+    for i, task_create in enumerate(task_creates):
+        # Offset created_at by position so (created_at, id) ordering keeps the input order
+        created_at = now + timedelta(microseconds=i)
+        rows.append({
+            **task_create.dict(),
+            "id": uuid4(),
+            "user_id": user_id,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+    return rows
+
+
+def _tasks_inserted(session: Session, rows: List[Dict[str, Any]], user_id: str):
+    """Bookkeeping shared by every bulk insert path"""
+    index_tasks(session, rows)
+    bump_task_stats(session, user_id, len(rows), sum(1 for row in rows if row["completed"]))
+    _tasks_changed(session, user_id)
+
+
+def create_tasks_bulk(session: Session, task_creates: Sequence[TaskCreate], user_id: str) -> List[UUID]:
+    """Insert many tasks with one multi-row INSERT; returns the new ids in input order"""
+    if not task_creates:
+        return []
+    rows = _new_task_rows(task_creates, user_id)
+    session.exec(insert(Task), params=rows)
+    _tasks_inserted(session, rows, user_id)
+    return [row["id"] for row in rows]
+
+
+def set_tasks_completed_bulk(session: Session, task_ids: Sequence[UUID], completed: bool, user_id: str) -> Dict[UUID, bool]:
+    """Set `completed` on many tasks with one UPDATE; maps each requested id to whether it was found"""
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        return {}
+    # Only touch rows whose state changes, so RETURNING yields the exact counter delta;
+    # tasks that were already in the requested state are then confirmed with one SELECT
+    statement = (
+        update(Task)
+        .where(Task.user_id == user_id, Task.id.in_(task_ids), Task.completed != completed)
+        .values(completed=completed, updated_at=get_pakistan_time())
+        .returning(Task.id)
+    )
+    found = set(session.exec(statement).scalars())
+    if found:
+        bump_task_stats(session, user_id, 0, len(found) if completed else -len(found))
+        _tasks_changed(session, user_id)
+    unchanged = [task_id for task_id in task_ids if task_id not in found]
+    if unchanged:
+        found.update(session.exec(
+            select(Task.id).where(Task.user_id == user_id, Task.id.in_(unchanged))
+        ))
+    return {task_id: task_id in found for task_id in task_ids}
+
+
+def delete_tasks_bulk(session: Session, task_ids: Sequence[UUID], user_id: str) -> Dict[UUID, bool]:
+    """Delete many tasks with one DELETE; maps each requested id to whether it was found"""
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        return {}
+    statement = (
+        delete(Task)
+        .where(Task.user_id == user_id, Task.id.in_(task_ids))
+        .returning(Task.id, Task.completed)
+    )
+    deleted = session.exec(statement).all()
+    found = {row.id for row in deleted}
+    if found:
+        unindex_tasks(session, found)
+        bump_task_stats(session, user_id, -len(deleted), -sum(1 for row in deleted if row.completed))
+        _tasks_changed(session, user_id)
+    return {task_id: task_id in found for task_id in task_ids}
+
+
+# Async variants for the AsyncSession request path. They run the sync implementations
+# above through AsyncSession.run_sync, so queries go over the async driver without
+# blocking the event loop and without duplicating the query logic.
+
+async def create_task_async(session: AsyncSession, task_create: TaskCreate, user_id: str) -> Task:
+    return await session.run_sync(create_task, task_create, user_id)
+
+
+async def get_tasks_async(session: AsyncSession, user_id: str, completed: Optional[bool] = None,
+                          offset: int = 0, limit: int = 50, cursor: Optional[str] = None,
+                          version: Optional[str] = None) -> List[Task]:
+    """get_tasks, with the cache lookup and fill awaited here so a shared store never blocks the loop"""
+    if not task_cache.enabled or str(user_id) in _pending_task_writes(session.sync_session):
+        return await session.run_sync(get_tasks, user_id, completed, offset, limit, cursor, version)
+    if version is None:
+        version = await get_tasks_version_async(session, user_id)
+    statement = _tasks_page_statement(user_id, completed, offset, limit, cursor)
+    key = _tasks_page_key(version, completed, offset, limit, cursor)
+    rows = await task_cache.get_or_load_async(
+        str(user_id), key, lambda: session.run_sync(_load_task_rows, statement)
+    )
+    return [Task(**row) for row in rows]
+
+
+async def get_task_async(session: AsyncSession, task_id: str, user_id: str) -> Optional[Task]:
+    return await session.run_sync(get_task, task_id, user_id)
+
+
+async def get_tasks_version_async(session: AsyncSession, user_id: str) -> str:
+    return await session.run_sync(get_tasks_version, user_id)
+
+
+async def get_task_version_async(session: AsyncSession, task_id: str, user_id: str) -> Optional[datetime]:
+    return await session.run_sync(get_task_version, task_id, user_id)
+
+
+async def update_task_async(session: AsyncSession, task_id: str, task_update: TaskUpdate, user_id: str) -> Optional[Task]:
+    return await session.run_sync(update_task, task_id, task_update, user_id)
+
+
+async def delete_task_async(session: AsyncSession, task_id: str, user_id: str) -> bool:
+    return await session.run_sync(delete_task, task_id, user_id)
+
+
+async def toggle_task_completion_async(session: AsyncSession, task_id: str, toggle_request: TaskToggleComplete, user_id: str) -> Optional[Task]:
+    return await session.run_sync(toggle_task_completion, task_id, toggle_request, user_id)
+
+
+async def create_tasks_bulk_async(session: AsyncSession, task_creates: Sequence[TaskCreate], user_id: str) -> List[UUID]:
+    return await session.run_sync(create_tasks_bulk, task_creates, user_id)
+
+
+async def import_tasks_async(session: AsyncSession, task_creates: Sequence[TaskCreate], user_id: str) -> List[UUID]:
+    """
+    Insert a chunk of imported tasks. On PostgreSQL (asyncpg) rows go through COPY;
+    other databases fall back to the multi-row INSERT of create_tasks_bulk.
+    """
+    if not task_creates:
+        return []
+    connection = await session.connection()
+    if connection.dialect.driver != "asyncpg":
+        return await create_tasks_bulk_async(session, task_creates, user_id)
+    rows = _new_task_rows(task_creates, user_id)
+    # SQLAlchemy's asyncpg adapter only opens its transaction on the first statement it
+    # runs, and COPY bypasses the adapter: without this the COPY would autocommit on its
+    # own, outside the transaction that updates the counters (and out of reach of rollback)
+    await connection.execute(select(1))
+    raw_connection = await connection.get_raw_connection()
+    user_uuid = UUID(str(user_id))
+    await raw_connection.driver_connection.copy_records_to_table(
+        Task.__tablename__,
+        columns=_TASK_COLUMNS,
+        records=[
+            tuple(user_uuid if column == "user_id" else row[column] for column in _TASK_COLUMNS)
+            for row in rows
+        ],
+    )
+    await session.run_sync(_tasks_inserted, rows, user_id)
+    return [row["id"] for row in rows]
+
+
+async def set_tasks_completed_bulk_async(session: AsyncSession, task_ids: Sequence[UUID], completed: bool, user_id: str) -> Dict[UUID, bool]:
+    return await session.run_sync(set_tasks_completed_bulk, task_ids, completed, user_id)
+
+
+async def delete_tasks_bulk_async(session: AsyncSession, task_ids: Sequence[UUID], user_id: str) -> Dict[UUID, bool]:
+    return await session.run_sync(delete_tasks_bulk, task_ids, user_id)
+
+
+async def iter_tasks_async(session: AsyncSession, user_id: str, completed: Optional[bool] = None,
+                           batch_size: int = 1000) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Stream all of a user's tasks as batches of column dicts, ordered by (created_at, id).
+    Uses a server-side cursor, so memory is bounded by `batch_size` rather than the row count.
+    """
+    statement = select(*(getattr(Task, column) for column in _TASK_COLUMNS)).where(Task.user_id == user_id)
+    if completed is not None:
+        statement = statement.where(Task.completed == completed)
+    statement = statement.order_by(Task.created_at, Task.id).execution_options(yield_per=batch_size)
+    result = await session.stream(statement)
+    async for partition in result.mappings().partitions():
+        yield [dict(row) for row in partition]
@@ -1,8 +1,15 @@
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 import json
-from groq import Groq
+import time
 from sqlmodel import Session
-from ..services.mcp_tools import MCPTools
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..services.mcp_tools import MCPTools, TaskSnapshot
+from ..services.intent_matcher import IntentMatch, intent_matcher
+from ..services.tool_decision_cache import ToolDecisionCache
+from ..services.llm.client import build_llm_client
+from ..services.llm.scheduler import LLMBusy, build_llm_scheduler
+from ..services.llm.resilience import RETRYABLE_ERRORS, CircuitOpen, build_resilient_caller
+from ..services.llm.router import build_model_router
 from ..models.chat import ChatRequest, ChatResponse
 from ..config.settings import settings
 
@@ -10,12 +17,30 @@ from ..config.settings import settings
 class TodoAgent:
     def __init__(self):
         print(f"Initializing TodoAgent with Groq API key: {settings.groq_api_key[:20]}...")
-        print(f"Using model: {settings.groq_model}")
+        print(f"Using model: {settings.groq_model}, escalating to {settings.groq_capable_model} (backend: {settings.llm_backend})")
         
-        self.client = Groq(api_key=settings.groq_api_key)
+        self.client = build_llm_client(settings.llm_backend)
         self.model = settings.groq_model
+        self.scheduler = build_llm_scheduler(settings.llm_scheduler_backend)
+        self.resilience = build_resilient_caller()
+        self.router = build_model_router()
         self.mcp_tools = MCPTools()
+        self.decision_cache = ToolDecisionCache(
+            settings.tool_decision_cache_ttl_seconds, settings.tool_decision_cache_max_entries
+        )
+        # Cached decisions are only valid for this exact prompt, tool schema and model
+        self.decision_schema = ToolDecisionCache.schema_hash(self.get_system_prompt(), self.get_tools_definition())
+        self._tools_chars = len(json.dumps(self.get_tools_definition()))
     
+    def estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Tokens to reserve for a call: prompt (~4 chars/token) plus the expected completion"""
+        prompt_chars = sum(len(msg.get("content") or "") for msg in messages) + self._tools_chars
+        return prompt_chars // 4 + settings.llm_completion_token_estimate
+
+    async def aclose(self):
+        """Close the pooled Groq connections"""
+        await self.client.close()
+
     def get_system_prompt(self) -> str:
         return """You are a helpful todo assistant that manages tasks through natural language.
 
@@ -135,7 +160,8 @@ Be natural and helpful!"""
             }
         ]
 
-    def execute_tool_call(self, session: Session, user_id: str, tool_name: str, tool_args: Dict[str, Any]) -> Dict[str, Any]:
+    def execute_tool_call(self, session: Session, user_id: str, tool_name: str, tool_args: Dict[str, Any],
+                          snapshot: Optional[TaskSnapshot] = None) -> Dict[str, Any]:
         """Execute a tool call from Groq"""
         print(f"Executing tool: {tool_name} with args: {tool_args}")
         
@@ -149,25 +175,28 @@ Be natural and helpful!"""
                     session, 
                     user_id, 
                     tool_args.get("title"),
-                    tool_args.get("description")
+                    tool_args.get("description"),
+                    snapshot=snapshot
                 )
             
             elif tool_name == "list_tasks":
                 # list_tasks doesn't need any parameters now
-                return self.mcp_tools.list_tasks(session, user_id, "all")
+                return self.mcp_tools.list_tasks(session, user_id, "all", snapshot=snapshot)
             
             elif tool_name == "complete_task":
                 return self.mcp_tools.complete_task(
                     session,
                     user_id,
-                    tool_args.get("task_id")
+                    tool_args.get("task_id"),
+                    snapshot=snapshot
                 )
             
             elif tool_name == "delete_task":
                 return self.mcp_tools.delete_task(
                     session,
                     user_id,
-                    tool_args.get("task_id")
+                    tool_args.get("task_id"),
+                    snapshot=snapshot
                 )
             
             elif tool_name == "update_task":
@@ -176,7 +205,8 @@ Be natural and helpful!"""
                     user_id,
                     tool_args.get("task_id"),
                     title=tool_args.get("title"),
-                    description=tool_args.get("description")
+                    description=tool_args.get("description"),
+                    snapshot=snapshot
                 )
             
             else:
@@ -188,6 +218,33 @@ Be natural and helpful!"""
             traceback.print_exc()
             return {"error": str(e)}
 
+    # Consecutive calls of these tools run as one bulk statement
+    _BATCHED_TOOLS = {"complete_task": MCPTools.complete_tasks, "delete_task": MCPTools.delete_tasks}
+
+    def execute_tool_calls(self, session: Session, user_id: str, calls: List[IntentMatch]) -> List[Dict[str, Any]]:
+        """
+        Execute one turn's tool calls in order. Task numbers all resolve against a single
+        snapshot taken at the start of the turn, and runs of complete_task / delete_task
+        calls are coalesced into one bulk UPDATE / DELETE.
+        """
+        snapshot = TaskSnapshot(session, user_id)
+        results: List[Dict[str, Any]] = []
+        i = 0
+        while i < len(calls):
+            tool_name, tool_args = calls[i]
+            run_end = i + 1
+            if tool_name in self._BATCHED_TOOLS:
+                while run_end < len(calls) and calls[run_end][0] == tool_name:
+                    run_end += 1
+            if run_end - i > 1:
+                task_ids = [(args or {}).get("task_id") for _, args in calls[i:run_end]]
+                print(f"Executing {run_end - i} {tool_name} calls as one batch: {task_ids}")
+                results.extend(self._BATCHED_TOOLS[tool_name](session, user_id, task_ids, snapshot))
+            else:
+                results.append(self.execute_tool_call(session, user_id, tool_name, tool_args, snapshot))
+            i = run_end
+        return results
+
     def _generate_response_from_tools(self, tool_calls: List[Dict[str, Any]]) -> str:
         """Generate user-friendly response from tool results"""
         if not tool_calls:
@@ -236,10 +293,8 @@ Be natural and helpful!"""
         
         return "\n\n".join(responses)
 
-    def process_message(self, session: Session, user_id: str, message: str, conversation_history: List[Dict[str, str]]) -> ChatResponse:
-        """Process user message using Groq function calling"""
-        
-        # Build conversation context
+    def _build_messages(self, message: str, conversation_history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """System prompt, then the conversation history, then the current message"""
         messages = [
             {"role": "system", "content": self.get_system_prompt()}
         ]
@@ -253,7 +308,112 @@ Be natural and helpful!"""
         
         # Add current message
         messages.append({"role": "user", "content": message})
+        return messages
+
+    def plan_without_llm(self, message: str) -> Optional[List[IntentMatch]]:
+        """Tool calls for the message from the local fast path or the decision cache, else None"""
+        if settings.chat_fast_path_enabled:
+            intent = intent_matcher.match(message)
+            if intent:
+                return [intent]
+        if settings.tool_decision_cache_max_entries > 0:
+            # Entries are keyed by the model that made the decision: the one this message
+            # routes to, or the capable model after an escalation
+            model, _ = self.router.choose(message)
+            models = [model]
+            escalation = self.router.escalation_for(model)
+            if escalation:
+                models.append(escalation)
+            return self.decision_cache.get(message, models, self.decision_schema)
+        return None
+
+    # Shown when the provider is unavailable and the message is not a simple command
+    DEGRADED_RESPONSE = (
+        "I can't reach the assistant right now. Simple commands still work, "
+        "like \"show my tasks\", \"add buy milk\" or \"complete task 1\"."
+    )
+
+    def fallback_plan(self, message: str) -> Optional[List[IntentMatch]]:
+        """Tool calls for the message when the LLM is unavailable, even with the fast path off"""
+        intent = intent_matcher.match(message)
+        if intent:
+            self.resilience.note_fallback("local")
+            return [intent]
+        self.resilience.note_fallback("degraded")
+        return None
+
+    def remember_decision(self, message: str, decisions: List[IntentMatch], model: str):
+        """Cache the decision under the model that actually produced it"""
+        if settings.tool_decision_cache_max_entries > 0:
+            self.decision_cache.put(message, model, self.decision_schema, decisions)
+
+    def parse_tool_calls(self, raw_calls: List[Dict[str, str]]) -> List[IntentMatch]:
+        """Decode {"name", "arguments"} tool calls; ValueError if the model produced unusable ones"""
+        known = {tool["function"]["name"] for tool in self.get_tools_definition()}
+        calls = []
+        for raw in raw_calls:
+            args = json.loads(raw["arguments"] or "{}")
+            if raw["name"] not in known or not isinstance(args, dict):
+                raise ValueError(f"Invalid tool call: {raw['name']}({raw['arguments']})")
+            calls.append((raw["name"], args))
+        return calls
+
+    async def _complete(self, user_id: str, messages: List[Dict[str, str]], model: str):
+        """One non-streaming completion on `model`, once the scheduler grants a slot"""
+        tokens = self.estimate_tokens(messages)
+
+        async def reserve_hedge():
+            # A hedge is a real call: it needs its own slot and token budget
+            return self.scheduler.release if await self.scheduler.try_acquire(tokens) else None
+
+        async with self.scheduler.slot(user_id, tokens):
+            started = time.monotonic()
+            # Bounded by per-attempt timeouts and a total deadline; may be hedged
+            response = await self.resilience.call(
+                lambda: self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    tools=self.get_tools_definition(),
+                    tool_choice="auto"
+                ),
+                reserve_hedge=reserve_hedge,
+            )
+            self.router.record_latency(model, time.monotonic() - started)
+        return response
+
+    async def _escalated_calls(self, user_id: str, messages: List[Dict[str, str]], model: str,
+                               error: ValueError) -> Tuple[Optional[List[IntentMatch]], Optional[str], str]:
+        """Ask the capable model again after `model`'s tool calls failed to parse: (calls, content, model)"""
+        capable = self.router.escalation_for(model)
+        if capable is None:
+            raise error
+        print(f"Escalating to {capable}: {error}")
+        self.router.record_escalation("invalid_tool_call")
+        assistant_message = (await self._complete(user_id, messages, capable)).choices[0].message
+        if not assistant_message.tool_calls:
+            return None, assistant_message.content, capable
+        return self.parse_tool_calls([
+            {"name": call.function.name, "arguments": call.function.arguments}
+            for call in assistant_message.tool_calls
+        ]), None, capable
+
+    async def process_message(self, session: AsyncSession, user_id: str, message: str, conversation_history: List[Dict[str, str]]) -> ChatResponse:
+        """Process user message using Groq function calling"""
+        planned = self.plan_without_llm(message)
+        if planned:
+            print(f"Without LLM: {planned}")
+            results = await session.run_sync(self.execute_tool_calls, user_id, planned)
+            tool_calls_results = [
+                {"tool": tool_name, "args": tool_args, "result": result}
+                for (tool_name, tool_args), result in zip(planned, results)
+            ]
+            return ChatResponse(
+                conversation_id=None,
+                response=self._generate_response_from_tools(tool_calls_results),
+                tool_calls=tool_calls_results
+            )
         
+        messages = self._build_messages(message, conversation_history)
         tool_calls_results = []
         
         try:
@@ -261,38 +421,39 @@ Be natural and helpful!"""
             print(f"Message: {message}")
             print(f"User ID: {user_id}")
             
-            # Make Groq API call WITH tools/function calling
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=self.get_tools_definition(),
-                tool_choice="auto"
-            )
+            model, reason = self.router.choose(message, bool(conversation_history))
+            self.router.record_decision(reason)
+            print(f"Routing to {model} ({reason})")
             
+            # Make Groq API call WITH tools/function calling
+            response = await self._complete(user_id, messages, model)
             assistant_message = response.choices[0].message
-            
-            # Check if AI wants to call tools
+            calls, content = None, assistant_message.content
             if assistant_message.tool_calls:
                 print(f"AI requested {len(assistant_message.tool_calls)} tool calls")
+                try:
+                    calls = self.parse_tool_calls([
+                        {"name": call.function.name, "arguments": call.function.arguments}
+                        for call in assistant_message.tool_calls
+                    ])
+                except ValueError as e:
+                    calls, content, model = await self._escalated_calls(user_id, messages, model, e)
+            
+            # Check if AI wants to call tools
+            if calls:
+                # Execute the tools against one task snapshot for the turn
+                results = await session.run_sync(self.execute_tool_calls, user_id, calls)
+                tool_calls_results = [
+                    {"tool": tool_name, "args": tool_args, "result": result}
+                    for (tool_name, tool_args), result in zip(calls, results)
+                ]
                 
-                for tool_call in assistant_message.tool_calls:
-                    tool_name = tool_call.function.name
-                    tool_args = json.loads(tool_call.function.arguments)
-                    
-                    # Execute the tool
-                    result = self.execute_tool_call(session, user_id, tool_name, tool_args)
-                    
-                    tool_calls_results.append({
-                        "tool": tool_name,
-                        "args": tool_args,
-                        "result": result
-                    })
-                
+                self.remember_decision(message, [(call["tool"], call["args"]) for call in tool_calls_results], model)
                 # Generate friendly response from tool results
                 final_response = self._generate_response_from_tools(tool_calls_results)
             else:
                 # No tool calls, just return the AI's text response
-                final_response = assistant_message.content or "I'm here to help!"
+                final_response = content or "I'm here to help!"
             
             return ChatResponse(
                 conversation_id=None,
@@ -300,6 +461,24 @@ Be natural and helpful!"""
                 tool_calls=tool_calls_results
             )
             
+        except LLMBusy:
+            # Surfaced as a 503 by the endpoint, so the client can retry
+            raise
+        except (CircuitOpen, *RETRYABLE_ERRORS) as e:
+            print(f"LLM unavailable ({type(e).__name__}), answering locally")
+            fallback = self.fallback_plan(message)
+            if not fallback:
+                return ChatResponse(conversation_id=None, response=self.DEGRADED_RESPONSE, tool_calls=[])
+            results = await session.run_sync(self.execute_tool_calls, user_id, fallback)
+            tool_calls_results = [
+                {"tool": tool_name, "args": tool_args, "result": result}
+                for (tool_name, tool_args), result in zip(fallback, results)
+            ]
+            return ChatResponse(
+                conversation_id=None,
+                response=self._generate_response_from_tools(tool_calls_results),
+                tool_calls=tool_calls_results
+            )
         except Exception as e:
             print(f"Error in TodoAgent.process_message: {str(e)}")
             print(f"Error type: {type(e)}")
@@ -311,3 +490,126 @@ Be natural and helpful!"""
                 response=f"Sorry, I encountered an error: {str(e)}",
                 tool_calls=[]
             )
+
+    async def _stream_tool_calls(self, session: AsyncSession, user_id: str, calls: List[IntentMatch],
+                                 tool_calls_results: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Announce the turn's tool calls, run them as one batch, then report each result"""
+        for tool_name, tool_args in calls:
+            yield {"event": "tool_call", "data": {"tool": tool_name, "args": tool_args}}
+        results = await session.run_sync(self.execute_tool_calls, user_id, calls)
+        for (tool_name, tool_args), result in zip(calls, results):
+            tool_calls_results.append({"tool": tool_name, "args": tool_args, "result": result})
+            yield {"event": "tool_result", "data": {"tool": tool_name, "result": result}}
+
+    async def stream_message(self, session: AsyncSession, user_id: str, message: str, conversation_history: List[Dict[str, str]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of process_message. Yields {"event", "data"} dicts: "token" for
+        each text delta, "tool_call" per requested tool and "tool_result" per result, "error"
+        if the turn fails, and finally "done" with the full response and tool calls.
+        """
+        planned = self.plan_without_llm(message)
+        if planned:
+            tool_calls_results = []
+            async for event in self._stream_tool_calls(session, user_id, planned, tool_calls_results):
+                yield event
+            final_response = self._generate_response_from_tools(tool_calls_results)
+            yield {"event": "token", "data": {"content": final_response}}
+            yield {"event": "done", "data": {"response": final_response, "tool_calls": tool_calls_results}}
+            return
+        
+        messages = self._build_messages(message, conversation_history)
+        tool_calls_results = []
+        
+        try:
+            content_parts = []
+            # Tool calls arrive as fragments keyed by index; arguments are concatenated JSON
+            pending_calls: Dict[int, Dict[str, str]] = {}
+            model, reason = self.router.choose(message, bool(conversation_history))
+            self.router.record_decision(reason)
+            # The slot is held until the stream is fully consumed
+            async with self.scheduler.slot(user_id, self.estimate_tokens(messages)):
+                started = time.monotonic()
+                # Retried until the stream opens; never hedged, and not retried once tokens flow
+                stream = await self.resilience.call(
+                    lambda: self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        tools=self.get_tools_definition(),
+                        tool_choice="auto",
+                        stream=True
+                    )
+                )
+            
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta.content:
+                        content_parts.append(delta.content)
+                        yield {"event": "token", "data": {"content": delta.content}}
+                    for call in delta.tool_calls or []:
+                        pending = pending_calls.setdefault(call.index, {"name": "", "arguments": ""})
+                        if call.function and call.function.name:
+                            pending["name"] += call.function.name
+                        if call.function and call.function.arguments:
+                            pending["arguments"] += call.function.arguments
+                self.router.record_latency(model, time.monotonic() - started)
+            
+            calls = None
+            if pending_calls:
+                print(f"AI requested {len(pending_calls)} tool calls")
+                try:
+                    calls = self.parse_tool_calls([pending_calls[index] for index in sorted(pending_calls)])
+                except ValueError as e:
+                    # Tool calls are not streamed as tokens, so nothing has reached the client yet
+                    calls, content, model = await self._escalated_calls(user_id, messages, model, e)
+                    if content:
+                        content_parts.append(content)
+                        yield {"event": "token", "data": {"content": content}}
+            
+            if calls:
+                async for event in self._stream_tool_calls(session, user_id, calls, tool_calls_results):
+                    yield event
+                
+                self.remember_decision(message, [(call["tool"], call["args"]) for call in tool_calls_results], model)
+                final_response = self._generate_response_from_tools(tool_calls_results)
+                yield {"event": "token", "data": {"content": final_response}}
+            else:
+                final_response = "".join(content_parts)
+                if not final_response:
+                    final_response = "I'm here to help!"
+                    yield {"event": "token", "data": {"content": final_response}}
+        
+        except LLMBusy as e:
+            final_response = "The assistant is busy right now, please try again in a few seconds."
+            tool_calls_results = []
+            yield {"event": "error", "data": {"detail": final_response, "retry_after": e.retry_after}}
+        
+        except (CircuitOpen, *RETRYABLE_ERRORS) as e:
+            if content_parts or pending_calls:
+                # Part of the answer is already out; the turn cannot be replayed
+                final_response = f"Sorry, I encountered an error: {type(e).__name__}"
+                tool_calls_results = []
+                yield {"event": "error", "data": {"detail": final_response}}
+            else:
+                print(f"LLM unavailable ({type(e).__name__}), answering locally")
+                fallback = self.fallback_plan(message)
+                tool_calls_results = []
+                if fallback:
+                    async for event in self._stream_tool_calls(session, user_id, fallback, tool_calls_results):
+                        yield event
+                    final_response = self._generate_response_from_tools(tool_calls_results)
+                else:
+                    final_response = self.DEGRADED_RESPONSE
+                yield {"event": "token", "data": {"content": final_response}}
+        
+        except Exception as e:
+            print(f"Error in TodoAgent.stream_message: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            
+            final_response = f"Sorry, I encountered an error: {str(e)}"
+            tool_calls_results = []
+            yield {"event": "error", "data": {"detail": final_response}}
+        
+        yield {"event": "done", "data": {"response": final_response, "tool_calls": tool_calls_results}}
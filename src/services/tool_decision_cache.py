@@ -0,0 +1,100 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .intent_matcher import IntentMatch, normalize_message
+
+# Words that point back into the conversation ("complete it", "delete that one too");
+# the model's decision for these depends on history, so they are never cached
+_CONTEXT_REFERENCE = re.compile(
+    r"\b(?:it|its|that|this|these|those|them|they|one|ones|same|again|too|also|above|previous|last|other|another)\b"
+)
+
+
+class ToolDecisionCache:
+    """
+    Bounded LRU + TTL cache of the model's tool-call decisions, keyed by the
+    normalized message, model and a hash of the prompt and tool schema. Only the
+    decision (tool names and arguments) is stored, never tool results, and only
+    for context-free messages whose string arguments all come from the message
+    itself, so replaying a decision cannot leak another user's data.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_message_length: int = 200):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_message_length = max_message_length
+        self._entries: "OrderedDict[str, Tuple[List[IntentMatch], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+
+    @staticmethod
+    def schema_hash(*parts: Any) -> str:
+        """Fingerprint of everything besides the message that shapes the decision"""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def _key(self, message: str, model: str, schema: str) -> Optional[str]:
+        text = normalize_message(message)
+        if not text or len(text) > self.max_message_length or _CONTEXT_REFERENCE.search(text):
+            return None
+        return f"{model}:{schema}:{text}"
+
+    def get(self, message: str, models: Sequence[str], schema: str) -> Optional[List[IntentMatch]]:
+        """The decision one of `models` made for the message (first found wins), else None"""
+        keys = [self._key(message, model, schema) for model in models]
+        if not keys or keys[0] is None:
+            self.skipped += 1
+            return None
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                # Copies, so callers cannot mutate the cached arguments
+                return [(name, dict(args)) for name, args in entry[0]]
+            self.misses += 1
+            return None
+
+    def put(self, message: str, model: str, schema: str, decisions: List[IntentMatch]):
+        key = self._key(message, model, schema)
+        if key is None or not decisions:
+            return
+        text = normalize_message(message)
+        for _, args in decisions:
+            for value in args.values():
+                # An argument the message does not contain came from history or the model's guess
+                if value is not None and (not isinstance(value, str) or value.lower() not in text):
+                    return
+        with self._lock:
+            self._entries[key] = ([(name, dict(args)) for name, args in decisions], time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "stores": self.stores,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
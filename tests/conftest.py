@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Settings are read when src is imported; fill in only what the environment leaves unset
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'todo_tests.db')}")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("BETTER_AUTH_SECRET", "test-better-auth-secret")
+os.environ.setdefault("GROQ_API_KEY", "gsk_test_key_not_used")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
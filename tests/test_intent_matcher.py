@@ -0,0 +1,68 @@
+from typing import List, Optional, Tuple
+import pytest
+from src.services.intent_matcher import IntentMatch, IntentMatcher
+
+# Expected fast-path result per message; None means it must fall through to the LLM.
+# Extend this when adding phrasings.
+CORPUS: List[Tuple[str, Optional[IntentMatch]]] = [
+    ("show my tasks", ("list_tasks", {})),
+    ("Show me all my tasks", ("list_tasks", {})),
+    ("list tasks", ("list_tasks", {})),
+    ("what's on my list?", ("list_tasks", {})),
+    ("What is on my todo list", ("list_tasks", {})),
+    ("my tasks", ("list_tasks", {})),
+    ("what are my tasks?", ("list_tasks", {})),
+    ("complete task 1", ("complete_task", {"task_id": "1"})),
+    ("Complete task #3.", ("complete_task", {"task_id": "3"})),
+    ("finish task number 2", ("complete_task", {"task_id": "2"})),
+    ("mark task 4 as done", ("complete_task", {"task_id": "4"})),
+    ("mark 2 complete", ("complete_task", {"task_id": "2"})),
+    ("complete the first task", ("complete_task", {"task_id": "1"})),
+    ("complete task three", ("complete_task", {"task_id": "3"})),
+    ("delete task 2", ("delete_task", {"task_id": "2"})),
+    ("remove task 10", ("delete_task", {"task_id": "10"})),
+    ("delete the first task", ("delete_task", {"task_id": "1"})),
+    ("Remove the 3rd one", ("delete_task", {"task_id": "3"})),
+    ("add buy milk", ("add_task", {"title": "buy milk"})),
+    ("add groceries to my list", ("add_task", {"title": "groceries"})),
+    ("Add a task called Call Mom", ("add_task", {"title": "Call Mom"})),
+    ("add task: pay rent", ("add_task", {"title": "pay rent"})),
+    ("add 'read a book' to my todo list", ("add_task", {"title": "read a book"})),
+    # Ambiguous or free-form: leave to the LLM
+    ("buy milk", None),
+    ("mark buy milk as done", None),
+    ("remove buy milk", None),
+    ("change task 1 to buy bread", None),
+    ("add a task", None),
+    ("add something", None),
+    ("can you add milk?", None),
+    ("add milk and eggs and then show my tasks?", None),
+    ("add a description to task 2", None),
+    ("add milk to task 1", None),
+    ("add 5 minutes to task 3", None),
+    ("add a note to the second task", None),
+    ("add eggs to #4", None),
+    ("add milk to 2", None),
+    ("add a trip to the zoo", ("add_task", {"title": "trip to the zoo"})),
+    ("add send invoice to 3 clients", ("add_task", {"title": "send invoice to 3 clients"})),
+    ("delete task 0", None),
+    ("complete all tasks", None),
+    ("hello", None),
+    ("show my completed tasks", None),
+]
+
+
+@pytest.mark.parametrize("message,expected", CORPUS)
+def test_corpus(message: str, expected: Optional[IntentMatch]):
+    assert IntentMatcher().match(message) == expected
+
+
+def test_stats_count_matches_and_fallbacks():
+    matcher = IntentMatcher()
+    for message, _ in CORPUS:
+        matcher.match(message)
+    stats = matcher.stats()
+    expected_hits = sum(1 for _, expected in CORPUS if expected is not None)
+    assert stats["checked"] == len(CORPUS)
+    assert stats["matched"] == expected_hits
+    assert stats["fallbacks"] == len(CORPUS) - expected_hits
@@ -0,0 +1,230 @@
+import asyncio
+import httpx
+import pytest
+from groq import AsyncGroq
+from src.services.llm.fake_groq import create_fake_groq_app
+from src.services.llm.resilience import CircuitBreaker, CircuitOpen, ResilientCaller
+from src.services.llm.scheduler import LLMBusy, LLMScheduler
+from src.services.shared_store import AsyncLocalSharedStore
+
+
+def fake_client(latency_ms: float = 10) -> AsyncGroq:
+    transport = httpx.ASGITransport(app=create_fake_groq_app(latency_ms=latency_ms, token_delay_ms=0))
+    return AsyncGroq(
+        api_key="test",
+        base_url="http://fake-groq",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=transport),
+    )
+
+
+def complete(client: AsyncGroq, message: str = "hello"):
+    return client.chat.completions.create(model="fake", messages=[{"role": "user", "content": message}])
+
+
+def scheduler(**overrides) -> LLMScheduler:
+    options = dict(max_concurrency=1, tokens_per_minute=0, max_queue=50, max_queue_per_user=5, queue_timeout=5)
+    options.update(overrides)
+    return LLMScheduler(**options)
+
+
+def test_queued_users_are_served_round_robin():
+    async def run():
+        client = fake_client(latency_ms=20)
+        llm = scheduler()
+        order = []
+
+        async def call(user_id: str):
+            async with llm.slot(user_id, 10):
+                order.append(user_id)
+                await complete(client)
+
+        chatty = [asyncio.ensure_future(call("chatty")) for _ in range(4)]
+        await asyncio.sleep(0.005)
+        others = [asyncio.ensure_future(call(user_id)) for user_id in ("a", "b")]
+        await asyncio.gather(*chatty, *others)
+        return order, llm.stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ["chatty", "chatty", "a", "b", "chatty", "chatty"]
+    assert stats["admitted"] == 6 and stats["in_flight"] == 0 and stats["queued"] == 0
+    assert stats["avg_model_seconds"] > 0
+
+
+def test_call_that_cannot_start_before_its_deadline_is_rejected():
+    async def run():
+        llm = scheduler()
+        async with llm.slot("holder", 10):
+            with pytest.raises(LLMBusy) as busy:
+                await llm.acquire("late", 10, timeout=0.05)
+        return busy.value, llm.stats()
+
+    busy, stats = asyncio.run(run())
+    assert busy.reason == "deadline"
+    assert stats["rejected"] == {"deadline": 1}
+    assert stats["in_flight"] == 0
+
+
+def test_user_queue_limit_rejects_immediately():
+    async def run():
+        llm = scheduler(max_queue_per_user=1)
+        async with llm.slot("holder", 10):
+            queued = asyncio.ensure_future(llm.acquire("u", 10))
+            await asyncio.sleep(0)
+            with pytest.raises(LLMBusy) as busy:
+                await llm.acquire("u", 10)
+        await queued
+        llm.release()
+        return busy.value
+
+    assert asyncio.run(run()).reason == "user_queue_full"
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def run():
+        client = fake_client()
+        llm = scheduler()
+        async with llm.slot("holder", 10):
+            waiter = asyncio.ensure_future(llm.acquire("gone", 10))
+            await asyncio.sleep(0.01)
+            assert llm.stats()["queued"] == 1
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        await asyncio.sleep(0.01)
+        # The slot went back to the pool rather than to the cancelled waiter
+        async with llm.slot("next", 10):
+            await complete(client)
+        return llm.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+    assert stats["admitted"] == 2
+
+
+def test_tokens_per_minute_budget_rejects_calls_it_cannot_fit():
+    async def run():
+        client = fake_client()
+        llm = scheduler(max_concurrency=4, tokens_per_minute=100)
+        async with llm.slot("a", 80):
+            await complete(client)
+        with pytest.raises(LLMBusy) as busy:
+            # The window refills in seconds, longer than this call may wait
+            await llm.acquire("b", 80, timeout=0.1)
+        return busy.value, llm.stats()
+
+    busy, stats = asyncio.run(run())
+    assert busy.reason == "tokens_per_minute"
+    assert busy.retry_after > 0.1
+    assert stats["rejected"] == {"tokens_per_minute": 1}
+    assert stats["in_flight"] == 0
+
+
+def caller(**overrides) -> ResilientCaller:
+    options = dict(attempt_timeout=1, total_timeout=2, max_retries=1, backoff_base=0.01, backoff_max=0.02)
+    options.update(overrides)
+    breaker = CircuitBreaker(options.pop("failure_threshold", 5), options.pop("reset_seconds", 30))
+    return ResilientCaller(breaker, **options)
+
+
+def test_resilient_caller_returns_the_fake_completion():
+    async def run():
+        client = fake_client()
+        resilient = caller()
+        response = await resilient.call(lambda: complete(client, "show my tasks"))
+        return response, resilient.stats()
+
+    response, stats = asyncio.run(run())
+    assert response.choices[0].message.tool_calls[0].function.name == "list_tasks"
+    assert stats["attempts"] == 1 and stats["retries"] == 0
+
+
+def test_slow_provider_is_retried_then_opens_the_circuit():
+    async def run():
+        client = fake_client(latency_ms=300)
+        resilient = caller(attempt_timeout=0.05, failure_threshold=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await resilient.call(lambda: complete(client))
+        with pytest.raises(CircuitOpen):
+            await resilient.call(lambda: complete(client))
+        return resilient.stats()
+
+    stats = asyncio.run(run())
+    assert stats["attempts"] == 2 and stats["retries"] == 1 and stats["timeouts"] == 2
+    assert stats["circuit"]["state"] == "open"
+    assert stats["circuit"]["short_circuited"] == 1
+
+
+def test_hedge_holds_a_scheduler_slot_and_is_skipped_without_one():
+    async def run(max_concurrency: int):
+        slow, fast = fake_client(latency_ms=400), fake_client(latency_ms=10)
+        clients = iter([slow, fast])
+        llm = scheduler(max_concurrency=max_concurrency)
+        resilient = caller(hedge_enabled=True, hedge_min_samples=1)
+        resilient.latencies.append(0.02)
+
+        async def reserve_hedge():
+            return llm.release if await llm.try_acquire(10) else None
+
+        async with llm.slot("u", 10):
+            response = await resilient.call(lambda: complete(next(clients)), reserve_hedge=reserve_hedge)
+        await asyncio.sleep(0.01)
+        return response, resilient.stats(), llm.stats()
+
+    _, stats, scheduler_stats = asyncio.run(run(max_concurrency=2))
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    assert scheduler_stats["in_flight"] == 0
+
+    _, stats, scheduler_stats = asyncio.run(run(max_concurrency=1))
+    assert stats["hedges"] == 0 and stats["hedges_skipped"] == 1
+    assert scheduler_stats["in_flight"] == 0
+
+
+class FlakyStore(AsyncLocalSharedStore):
+    """In-process store that fails like an unreachable Redis while `failing` is set"""
+
+    failing = False
+
+    async def incrby(self, key, amount):
+        if self.failing:
+            raise ConnectionError("store unreachable")
+        return await super().incrby(key, amount)
+
+
+def test_store_errors_do_not_leak_slots():
+    async def run():
+        store = FlakyStore()
+        llm = scheduler(max_concurrency=2, tokens_per_minute=1000, store=store)
+        store.failing = True
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await llm.acquire("u", 10, timeout=0.1)
+        with pytest.raises(ConnectionError):
+            await llm.try_acquire(10)
+        assert llm.stats()["in_flight"] == 0
+        store.failing = False
+        async with llm.slot("u", 10, timeout=0.1):
+            assert llm.stats()["in_flight"] == 1
+        return llm.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0 and stats["admitted"] == 1
+
+
+def test_store_error_while_dispatching_fails_the_waiter():
+    async def run():
+        store = FlakyStore()
+        llm = scheduler(tokens_per_minute=1000, store=store)
+        async with llm.slot("holder", 10):
+            waiter = asyncio.ensure_future(llm.acquire("queued", 10, timeout=1))
+            await asyncio.sleep(0.01)
+            store.failing = True
+        with pytest.raises(ConnectionError):
+            await waiter
+        store.failing = False
+        async with llm.slot("next", 10, timeout=0.1):
+            pass
+        return llm.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
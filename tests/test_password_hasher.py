@@ -0,0 +1,38 @@
+import asyncio
+import os
+import pytest
+from src.services.password_hasher import PasswordHasherBusy, PasswordHasherPool
+
+
+def test_pool_that_lost_a_worker_is_replaced():
+    async def run():
+        pool = PasswordHasherPool(workers=1, max_queue=4)
+        try:
+            assert await pool.run(pow, 2, 10) == 1024
+            # The worker dies mid-call, as it would when OOM-killed
+            with pytest.raises(PasswordHasherBusy):
+                await pool.run(os._exit, 1)
+            assert await pool.run(pow, 3, 3) == 27
+            return pool.stats()
+        finally:
+            pool.shutdown()
+
+    stats = asyncio.run(run())
+    assert stats["completed"] == 2
+    assert stats["failed"] == 1 and stats["restarts"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_failed_calls_are_not_counted_as_completed():
+    async def run():
+        pool = PasswordHasherPool(workers=1, max_queue=4)
+        try:
+            with pytest.raises(ValueError):
+                await pool.run(int, "not a number")
+            return pool.stats()
+        finally:
+            pool.shutdown()
+
+    stats = asyncio.run(run())
+    assert stats["completed"] == 0 and stats["failed"] == 1
+    assert stats["avg_seconds"] == 0.0
@@ -0,0 +1,139 @@
+import asyncio
+import httpx
+import pytest
+from src.api.middleware.rate_limit import RateLimitMiddleware
+from src.config.settings import settings
+from src.services import rate_limiter as rate_limiter_module
+from src.services.auth_service import create_access_token
+from src.services.rate_limiter import SlidingWindowLimiter
+from src.services.shared_store import AsyncLocalSharedStore
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Start exactly on a window boundary (window index 1000 for 60s windows)
+    clock = Clock(60 * 1000)
+    monkeypatch.setattr(rate_limiter_module, "time", clock)
+    return clock
+
+
+def test_budget_is_spent_within_a_window(clock):
+    async def run():
+        limiter = SlidingWindowLimiter(AsyncLocalSharedStore(), 60)
+        results = [await limiter.hit("ip:a", 3, 10) for _ in range(4)]
+        other = await limiter.hit("ip:b", 3, 10)
+        return results, other, limiter.stats()
+
+    results, other, stats = asyncio.run(run())
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert other == (True, 0.0)
+    assert stats["allowed"] == 4 and stats["rejected"] == 1
+
+
+def test_rejected_hit_is_refunded(clock):
+    async def run():
+        store = AsyncLocalSharedStore()
+        limiter = SlidingWindowLimiter(store, 60)
+        await limiter.hit("ip:a", 8, 10)
+        rejected = await limiter.hit("ip:a", 5, 10)
+        # The refund leaves room for a cheaper request in the same window
+        cheap = await limiter.hit("ip:a", 2, 10)
+        return rejected, cheap, int(await store.get("ratelimit:ip:a:1000"))
+
+    rejected, cheap, counter = asyncio.run(run())
+    assert rejected[0] is False
+    assert cheap == (True, 0.0)
+    assert counter == 10
+
+
+def test_previous_window_is_weighted_by_its_overlap(clock):
+    async def run():
+        limiter = SlidingWindowLimiter(AsyncLocalSharedStore(), 60)
+        await limiter.hit("ip:a", 10, 10)
+        # A quarter into the next window, 75% of the previous 10 still counts
+        clock.now += 60 + 15
+        fits = await limiter.hit("ip:a", 2, 10)
+        too_much = await limiter.hit("ip:a", 2, 10)
+        return fits, too_much
+
+    fits, (allowed, retry_after) = asyncio.run(run())
+    assert fits == (True, 0.0)
+    assert allowed is False
+    # used = 7.5 + 4 = 11.5; 1.5 of the previous window slides out in 1.5 * 60 / 10 seconds
+    assert retry_after == pytest.approx(9.0)
+
+
+def test_retry_after_waits_for_the_window_end_without_previous_hits(clock):
+    async def run():
+        limiter = SlidingWindowLimiter(AsyncLocalSharedStore(), 60)
+        clock.now += 20
+        await limiter.hit("ip:a", 10, 10)
+        return await limiter.hit("ip:a", 1, 10)
+
+    assert asyncio.run(run()) == (False, pytest.approx(40.0))
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": scope.get("state", {}).get("user_id", "anonymous").encode()})
+
+
+@pytest.fixture
+def budgets(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_user_budget", 3)
+    monkeypatch.setattr(settings, "rate_limit_ip_budget", 2)
+    monkeypatch.setattr(settings, "rate_limit_default_cost", 1)
+    monkeypatch.setattr(settings, "rate_limit_costs", {"POST /api/chat": 2})
+
+
+def send_requests(limiter, requests, client_ip="10.0.0.1"):
+    async def run():
+        transport = httpx.ASGITransport(app=RateLimitMiddleware(ok_app, limiter), client=(client_ip, 1234))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.request(method, path, headers=headers) for method, path, headers in requests]
+
+    return asyncio.run(run())
+
+
+def test_middleware_answers_429_with_retry_after(clock, budgets):
+    limiter = SlidingWindowLimiter(AsyncLocalSharedStore(), 60)
+    clock.now += 50
+    responses = send_requests(limiter, [("GET", "/api/tasks", {})] * 3)
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[2].json() == {"detail": "Rate limit exceeded"}
+    assert responses[2].headers["retry-after"] == "10"
+
+
+def test_middleware_keys_users_by_id_and_others_by_ip(clock, budgets):
+    limiter = SlidingWindowLimiter(AsyncLocalSharedStore(), 60)
+    bearer = {"Authorization": f"Bearer {create_access_token({'sub': 'user-1'})}"}
+    responses = send_requests(limiter, [
+        # Anonymous: the IP budget of 2
+        ("GET", "/api/tasks", {}),
+        ("GET", "/api/tasks", {}),
+        ("GET", "/api/tasks", {}),
+        # Same IP with a token: the user's own budget of 3, set in request state
+        ("GET", "/api/tasks", bearer),
+        ("POST", "/api/chat", bearer),
+        ("GET", "/api/tasks", bearer),
+        # An invalid token falls back to the (spent) IP budget
+        ("GET", "/api/tasks", {"Authorization": "Bearer not-a-jwt"}),
+    ])
+    assert [r.status_code for r in responses] == [200, 200, 429, 200, 200, 429, 429]
+    assert responses[3].text == "user-1"
+    assert responses[0].text == "anonymous"
+
+
+def test_options_requests_are_not_charged(clock, budgets):
+    limiter = SlidingWindowLimiter(AsyncLocalSharedStore(), 60)
+    responses = send_requests(limiter, [("OPTIONS", "/api/tasks", {})] * 5 + [("GET", "/api/tasks", {})])
+    assert all(r.status_code == 200 for r in responses)
+    assert limiter.stats()["allowed"] == 1
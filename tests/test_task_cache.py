@@ -0,0 +1,63 @@
+import asyncio
+from uuid import uuid4
+import pytest
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.database import async_engine, create_db_and_tables
+from src.models.task import TaskCreate
+from src.services import task_service
+from src.services.shared_store import AsyncLocalSharedStore, LocalSharedStore
+from src.services.task_cache import SharedTaskCacheBackend, TaskCache
+
+
+@pytest.fixture(scope="module", autouse=True)
+def tables():
+    create_db_and_tables()
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    # Fractional TTL, as settings.task_cache_ttl_seconds allows
+    cache = TaskCache(SharedTaskCacheBackend(AsyncLocalSharedStore(), 0.5, 1024 * 1024))
+    monkeypatch.setattr(task_service, "task_cache", cache)
+    return cache
+
+
+def test_local_store_rejects_float_seconds_like_redis():
+    store = LocalSharedStore()
+    with pytest.raises(TypeError):
+        store.set("key", "value", ex=1.5)
+    store.set("key", "value", ex=2)
+    with pytest.raises(TypeError):
+        store.expire("key", 0.5)
+    with pytest.raises(TypeError):
+        store.incrby("counter", 1.0)
+    assert 0 < store.ttl("key") <= 2
+
+
+def test_shared_backend_serves_pages_through_the_async_store(shared_cache):
+    user_id = str(uuid4())
+
+    async def run():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            await task_service.create_task_async(session, TaskCreate(title="first"), user_id)
+            # Uncommitted writes bypass the cache
+            assert [t.title for t in await task_service.get_tasks_async(session, user_id)] == ["first"]
+            await session.commit()
+
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            first = await task_service.get_tasks_async(session, user_id)
+            again = await task_service.get_tasks_async(session, user_id)
+            stats_before_write = dict(shared_cache.stats())
+            await task_service.create_task_async(session, TaskCreate(title="second"), user_id)
+            await session.commit()
+
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            # The write bumped the task version, so the cached page is not served
+            after_write = await task_service.get_tasks_async(session, user_id)
+        return first, again, after_write, stats_before_write
+
+    first, again, after_write, stats = asyncio.run(run())
+    assert [t.title for t in first] == [t.title for t in again] == ["first"]
+    assert again[0].id == first[0].id
+    assert stats["bypasses"] == 1 and stats["misses"] == 1 and stats["hits"] == 1
+    assert [t.title for t in after_write] == ["first", "second"]